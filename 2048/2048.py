@@ -1,11 +1,15 @@
+import argparse
+import time
 import pygame
-import random
+from bitboard import MAX_EXPONENT
+from game_state import GameState
+from replay import Replay
 
 # Initialize Pygame
 pygame.init()
 
 # Constants
-GRID_SIZE = 4
+GRID_SIZE = 4  # default; --size picks anything from 2 to 16
 CELL_SIZE = 100
 MARGIN = 10
 WIDTH = GRID_SIZE * (CELL_SIZE + MARGIN) + MARGIN
@@ -29,110 +33,263 @@ COLORS = {
     1024: (237, 197, 63),
     2048: (237, 194, 46)
 }
+SUPER_TILE_COLOR = (60, 58, 50)  # every tile above 2048
+SLIDE_TIME = 0.1  # seconds a move takes to animate
 
-class Game2048:
-    def __init__(self):
-        self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
+class TileAtlas:
+    # Every tile from exponent 0 (empty) up to max_exponent rendered once,
+    # side by side on one surface, so drawing a tile is a single blit
+    def __init__(self, cell_size, max_exponent=MAX_EXPONENT):
+        self.cell_size = cell_size
+        self.max_exponent = max_exponent
+        self.surface = pygame.Surface(((max_exponent + 1) * cell_size, cell_size))
+        for exponent in range(max_exponent + 1):
+            value = 1 << exponent if exponent else 0
+            area = self.area(exponent)
+            self.surface.fill(COLORS.get(value, SUPER_TILE_COLOR), area)
+            if value:
+                # Shrink the digits of 4-digit and longer tiles so they still fit
+                digits = len(str(value))
+                font = pygame.font.Font(None, max(8, cell_size * 36 // 100 * 3 // max(3, digits)))
+                color = (0, 0, 0) if value in COLORS else (249, 246, 242)
+                text = font.render(str(value), True, color)
+                self.surface.blit(text, text.get_rect(center=area.center))
+
+    def area(self, exponent):
+        return pygame.Rect(exponent * self.cell_size, 0, self.cell_size, self.cell_size)
+
+class Game2048(GameState):
+    # GameState with a window: drawing and keyboard input
+    def __init__(self, size=GRID_SIZE, seed=None):
+        self.screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE)
         pygame.display.set_caption("2048")
         self.clock = pygame.time.Clock()
-        self.grid = [[0 for _ in range(GRID_SIZE)] for _ in range(GRID_SIZE)]
-        self.score = 0
-        self.add_new_tile()
-        self.add_new_tile()
-
-    def add_new_tile(self):
-        empty_cells = [(i, j) for i in range(GRID_SIZE) for j in range(GRID_SIZE) if self.grid[i][j] == 0]
-        if empty_cells:
-            i, j = random.choice(empty_cells)
-            self.grid[i][j] = 2 if random.random() < 0.9 else 4
-
-    def move(self, direction):
-        moved = False
-        if direction == "UP":
-            for j in range(GRID_SIZE):
-                column = [self.grid[i][j] for i in range(GRID_SIZE) if self.grid[i][j] != 0]
-                column = self.merge(column)
-                for i in range(GRID_SIZE):
-                    value = column[i] if i < len(column) else 0
-                    if self.grid[i][j] != value:
-                        moved = True
-                    self.grid[i][j] = value
-        elif direction == "DOWN":
-            for j in range(GRID_SIZE):
-                column = [self.grid[i][j] for i in range(GRID_SIZE-1, -1, -1) if self.grid[i][j] != 0]
-                column = self.merge(column)
-                for i in range(GRID_SIZE-1, -1, -1):
-                    value = column[GRID_SIZE-1-i] if GRID_SIZE-1-i < len(column) else 0
-                    if self.grid[i][j] != value:
-                        moved = True
-                    self.grid[i][j] = value
-        elif direction == "LEFT":
-            for i in range(GRID_SIZE):
-                row = [self.grid[i][j] for j in range(GRID_SIZE) if self.grid[i][j] != 0]
-                row = self.merge(row)
-                for j in range(GRID_SIZE):
-                    value = row[j] if j < len(row) else 0
-                    if self.grid[i][j] != value:
-                        moved = True
-                    self.grid[i][j] = value
-        elif direction == "RIGHT":
-            for i in range(GRID_SIZE):
-                row = [self.grid[i][j] for j in range(GRID_SIZE-1, -1, -1) if self.grid[i][j] != 0]
-                row = self.merge(row)
-                for j in range(GRID_SIZE-1, -1, -1):
-                    value = row[GRID_SIZE-1-j] if GRID_SIZE-1-j < len(row) else 0
-                    if self.grid[i][j] != value:
-                        moved = True
-                    self.grid[i][j] = value
-        if moved:
-            self.add_new_tile()
-
-    def merge(self, line):
-        for i in range(len(line) - 1):
-            if line[i] == line[i + 1]:
-                line[i] *= 2
-                self.score += line[i]
-                line.pop(i + 1)
-                line.append(0)
-        return line
+        # Computer player while auto-play is on, else None: expectimax
+        # (toggled with A) or the trained n-tuple network (toggled with N)
+        self.ai = None
+        # (start time, moving tiles, screen areas they cross) while a move
+        # is sliding, else None; base is the screen without the moving tiles
+        self.animation = None
+        self.base = None
+        # Areas restored from base when an animation ended, which the next
+        # draw() pushes to the screen with the cells it changes
+        self.restored = []
+        super().__init__(size=size, seed=seed)
+        self.atlas = None
+        self.resize(WIDTH, HEIGHT)
+
+    def toggle_autoplay(self, player="expectimax"):
+        if self.ai:
+            self.ai = None
+            return
+        if self.size != 4:
+            print("Auto-play only knows the 4x4 board")
+            return
+        # Imported on first use: their tables take a moment to build
+        if player == "ntuple":
+            from ntuple import NTupleNetwork
+            try:
+                self.ai = NTupleNetwork.load()
+            except (ImportError, OSError) as e:
+                print(f"Can't load the n-tuple network (train it with ntuple.py): {e}")
+            return
+        from expectimax import ExpectimaxAI
+        # Leaves most of a 60 FPS frame for drawing
+        self.ai = ExpectimaxAI(time_budget=0.008)
+
+    def autoplay_step(self):
+        # Auto-play moves every frame, too fast to animate
+        self.finish_animation()
+        direction = self.ai.best_move(self.board)
+        if direction is None:
+            self.ai = None  # game over
+            return
+        self.move(direction)
+
+    def resize(self, width, height):
+        # Largest cells that fit the window, with gaps scaled to match. The
+        # atlas is re-rendered only if the cell size changed.
+        self.screen = pygame.display.get_surface()
+        # size * step + step // 11 fills the space, which gives 110px steps
+        # (100px cells, 10px gaps) for the classic board in the default window
+        step = max(12, min(width, height - 50) * 11 // (11 * self.size + 1))
+        self.margin = max(2, step // 11)
+        cell_size = step - self.margin
+        if self.atlas is None or cell_size != self.atlas.cell_size:
+            self.atlas = TileAtlas(cell_size, MAX_EXPONENT if self.size == 4 else MAX_EXPONENT + 2)
+        self.animation = None
+        self.base = None
+        self.drawn = None
+
+    def cell_rect(self, k):
+        step = self.atlas.cell_size + self.margin
+        i, j = divmod(k, self.size)
+        return pygame.Rect(j * step + self.margin, i * step + self.margin, self.atlas.cell_size, self.atlas.cell_size)
 
     def draw(self):
-        self.screen.fill(BACKGROUND_COLOR)
-        for i in range(GRID_SIZE):
-            for j in range(GRID_SIZE):
-                value = self.grid[i][j]
-                color = COLORS.get(value, COLORS[0])
-                pygame.draw.rect(self.screen, color, (j*(CELL_SIZE+MARGIN)+MARGIN, i*(CELL_SIZE+MARGIN)+MARGIN, CELL_SIZE, CELL_SIZE))
-                if value != 0:
-                    text = FONT.render(str(value), True, (0, 0, 0))
-                    text_rect = text.get_rect(center=(j*(CELL_SIZE+MARGIN)+MARGIN+CELL_SIZE//2, i*(CELL_SIZE+MARGIN)+MARGIN+CELL_SIZE//2))
-                    self.screen.blit(text, text_rect)
-        
-        score_text = FONT.render(f"Score: {self.score}", True, (0, 0, 0))
-        self.screen.blit(score_text, (10, HEIGHT - 40))
+        # Blits only the cells that changed since the last draw (everything
+        # after a resize or expose) and pushes just those to the screen
+        exponents = self.engine.exponents(self.board)
+        top = max(exponents)
+        if top > self.atlas.max_exponent:
+            self.atlas = TileAtlas(self.atlas.cell_size, top + 2)
+            self.drawn = None
+        if self.drawn is None:
+            self.screen.fill(BACKGROUND_COLOR)
+            changed = range(len(exponents))
+        else:
+            changed = [k for k, (old, new) in enumerate(zip(self.drawn, exponents)) if old != new]
+        rects = []
+        for k in changed:
+            rect = self.cell_rect(k)
+            self.screen.blit(self.atlas.surface, rect, self.atlas.area(exponents[k]))
+            rects.append(rect)
+        rects += self.restored
+        self.restored = []
+
+        score_top = self.size * (self.atlas.cell_size + self.margin) + self.margin
+        score_rect = pygame.Rect(0, score_top, self.screen.get_width(), 50)
+        self.screen.fill(BACKGROUND_COLOR, score_rect)
+        score_text = FONT.render(f"Score: {self.score}" + ("  (auto)" if self.ai else ""), True, (0, 0, 0))
+        self.screen.blit(score_text, (10, score_top + 10))
+        rects.append(score_rect)
+
+        if self.drawn is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(rects)
+        self.drawn = exponents
+
+    def handle_event(self, event):
+        # Whether the event changed anything that needs drawing
+        if event.type == pygame.VIDEORESIZE:
+            self.resize(event.w, event.h)
+            return True
+        if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+            self.finish_animation()
+            self.drawn = None
+            return True
+        if event.type != pygame.KEYDOWN:
+            return False
+        directions = {pygame.K_UP: "UP", pygame.K_DOWN: "DOWN", pygame.K_LEFT: "LEFT", pygame.K_RIGHT: "RIGHT"}
+        if event.key in directions:
+            return self.slide(directions[event.key])
+        if event.key == pygame.K_a:
+            self.toggle_autoplay()
+            return True
+        if event.key == pygame.K_n:
+            self.toggle_autoplay("ntuple")
+            return True
+        if event.key == pygame.K_s:
+            self.save_replay()
+        return False
+
+    def save_replay(self):
+        path = time.strftime("2048-%Y%m%d-%H%M%S.replay")
+        Replay.of(self).save(path)
+        print(f"Saved the replay of {self.moves} moves to {path}")
+
+    def slide(self, direction):
+        # Plays a move and starts its animation. A move made while the last
+        # one is still sliding cuts that one short first. Returns whether
+        # anything needs drawing.
+        self.finish_animation()
+        self.draw()
+        slides = self.engine.slides(self.board, direction)
+        if not self.move(direction):
+            return False
+        self.start_animation(slides)
+        return self.animation is None
+
+    def start_animation(self, slides):
+        moving = [(source, destination, exponent) for source, destination, exponent, _ in slides
+                  if source != destination]
+        if not moving:
+            return
+        # The screen still shows the board before the move; take the moving
+        # tiles off it to get the background they slide over
+        self.base = self.screen.copy()
+        empty = self.atlas.area(0)
+        for source, _, _ in moving:
+            self.base.blit(self.atlas.surface, self.cell_rect(source), empty)
+        spans = [self.cell_rect(source).union(self.cell_rect(destination)) for source, destination, _ in moving]
+        self.animation = (time.perf_counter(), moving, spans)
+
+    def animate(self):
+        # Draws the current frame of the animation; True once it is over.
+        # Only the areas the moving tiles cross are redrawn, so a frame
+        # costs the same however big the board is around them.
+        start, moving, spans = self.animation
+        t = min(1.0, (time.perf_counter() - start) / SLIDE_TIME)
+        eased = t * (2 - t)
+        for span in spans:
+            self.screen.blit(self.base, span, span)
+        for source, destination, exponent in moving:
+            a = self.cell_rect(source)
+            b = self.cell_rect(destination)
+            position = (a.x + round((b.x - a.x) * eased), a.y + round((b.y - a.y) * eased))
+            self.screen.blit(self.atlas.surface, position, self.atlas.area(exponent))
+        pygame.display.update(spans)
+        return t == 1.0
+
+    def finish_animation(self):
+        # Ends the animation where it is: wipes the moving tiles and marks
+        # the cells they touched for the next draw()
+        if self.animation is None:
+            return
+        _, moving, spans = self.animation
+        for span in spans:
+            self.screen.blit(self.base, span, span)
+        self.restored += spans
+        if self.drawn is not None:
+            self.drawn = list(self.drawn)
+            for source, destination, _ in moving:
+                self.drawn[source] = self.drawn[destination] = -1
+        self.animation = None
+        self.base = None
 
     def run(self):
-        running = True
-        while running:
-            for event in pygame.event.get():
+        # Draws only when something changed. With nobody playing for us and
+        # nothing sliding the loop sleeps in event.wait(); otherwise it
+        # runs at 60 frames per second. Animations go by the clock, not by
+        # frames, and a key pressed mid-slide finishes it at once.
+        dirty = True
+        while True:
+            busy = self.ai or self.animation
+            events = pygame.event.get() if busy else [pygame.event.wait()]
+            for event in events:
                 if event.type == pygame.QUIT:
-                    running = False
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_UP:
-                        self.move("UP")
-                    elif event.key == pygame.K_DOWN:
-                        self.move("DOWN")
-                    elif event.key == pygame.K_LEFT:
-                        self.move("LEFT")
-                    elif event.key == pygame.K_RIGHT:
-                        self.move("RIGHT")
-
-            self.draw()
-            pygame.display.flip()
-            self.clock.tick(60)
+                    pygame.quit()
+                    return
+                dirty |= self.handle_event(event)
+
+            if self.animation and self.animate():
+                self.finish_animation()
+                dirty = True
+
+            if self.ai:
+                self.autoplay_step()
+                dirty = True
 
-        pygame.quit()
+            if dirty and not self.animation:
+                self.draw()
+                dirty = False
+            if self.ai or self.animation:
+                self.clock.tick(60)
 
 if __name__ == "__main__":
-    game = Game2048()
-    game.run()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="2048")
+    parser.add_argument("--size", type=int, default=GRID_SIZE, help="cells per side, 2 to 16 (default 4)")
+    parser.add_argument("--replay", default=None, help="pick up the game saved in this replay file (S saves one)")
+    parser.add_argument("--move", type=int, default=None, help="with --replay, start after this move instead of the last")
+    args = parser.parse_args()
+    if not 2 <= args.size <= 16:
+        parser.error("--size must be between 2 and 16")
+    if args.replay:
+        # Fast-forwards through the saved moves before the first frame is drawn
+        replay = Replay.load(args.replay)
+        game = Game2048(replay.size, replay.seed)
+        replay.play(game, None if args.move is None else max(0, min(args.move, len(replay))))
+    else:
+        game = Game2048(args.size)
+    game.run()
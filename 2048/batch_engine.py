@@ -0,0 +1,168 @@
+import bitboard
+from optional_numpy import np, require_numpy
+
+def _require_numpy():
+    require_numpy("The batched 2048 engine")
+
+# Direction codes used for arrays of moves, in bitboard.DIRECTIONS order
+UP, DOWN, LEFT, RIGHT = range(4)
+
+_TABLES = None
+
+def _tables():
+    # bitboard's row tables as uint64 arrays, built on first use
+    global _TABLES
+    if _TABLES is None:
+        _require_numpy()
+        _TABLES = {name: np.array(getattr(bitboard, name), dtype=np.uint64)
+                   for name in ("ROW_LEFT", "ROW_RIGHT", "COLUMN_UP", "COLUMN_DOWN", "ROW_SCORE")}
+    return _TABLES
+
+def transpose(boards):
+    # bitboard.transpose on a uint64 array
+    a1 = boards & np.uint64(0xF0F00F0FF0F00F0F)
+    a2 = boards & np.uint64(0x0000F0F00000F0F0)
+    a3 = boards & np.uint64(0x0F0F00000F0F0000)
+    a = a1 | (a2 << np.uint64(12)) | (a3 >> np.uint64(12))
+    b1 = a & np.uint64(0xFF00FF0000FF00FF)
+    b2 = a & np.uint64(0x00FF00FF00000000)
+    b3 = a & np.uint64(0x00000000FF00FF00)
+    return b1 | (b2 >> np.uint64(24)) | (b3 << np.uint64(24))
+
+def move_boards(boards, direction):
+    # bitboard.move for every board in a uint64 array, all in the same
+    # direction (a code or a name): (new boards, score gained by each)
+    tables = _tables()
+    if isinstance(direction, str):
+        direction = bitboard.DIRECTIONS.index(direction)
+    vertical = direction in (UP, DOWN)
+    source = transpose(boards) if vertical else boards
+    table = tables[("COLUMN_UP", "COLUMN_DOWN", "ROW_LEFT", "ROW_RIGHT")[direction]]
+    score_table = tables["ROW_SCORE"]
+    moved = np.zeros_like(boards)
+    score = np.zeros(boards.shape, dtype=np.int64)
+    for k in range(4):
+        lines = ((source >> np.uint64(16 * k)) & np.uint64(0xFFFF)).astype(np.intp)
+        # Columns come back laid out as column 0, rows as row 0
+        moved |= table[lines] << np.uint64(4 * k if vertical else 16 * k)
+        score += score_table[lines].astype(np.int64)
+    return moved, score
+
+def empty_mask(boards):
+    # (N, 16) booleans: cell 4 * i + j of each board is empty
+    cells = (boards[:, None] >> (np.arange(16, dtype=np.uint64) * np.uint64(4))) & np.uint64(0xF)
+    return cells == 0
+
+def add_random_tiles(boards, rng, where=None):
+    # bitboard.add_random_tile on every board (or those selected by the
+    # boolean array `where`) that has an empty cell
+    empty = empty_mask(boards)
+    counts = empty.sum(axis=1)
+    pick = counts > 0
+    if where is not None:
+        pick &= where
+    index = np.flatnonzero(pick)
+    if not len(index):
+        return boards
+    # The r-th empty cell of each board, for a uniform r below its count
+    r = (rng.random(len(index)) * counts[index]).astype(np.int64)
+    cell = (np.cumsum(empty[index], axis=1) > r[:, None]).argmax(axis=1)
+    value = np.where(rng.random(len(index)) < 0.9, 1, 2).astype(np.uint64)
+    boards = boards.copy()
+    boards[index] |= value << (cell.astype(np.uint64) * np.uint64(4))
+    return boards
+
+def legal_moves(boards):
+    # (N, 4) booleans: which directions change each board
+    return np.stack([move_boards(boards, d)[0] != boards for d in range(4)], axis=1)
+
+def max_tiles(boards):
+    cells = (boards[:, None] >> (np.arange(16, dtype=np.uint64) * np.uint64(4))) & np.uint64(0xF)
+    exponents = cells.max(axis=1).astype(np.int64)
+    return np.where(exponents > 0, 1 << exponents, 0)
+
+class BatchGames:
+    # N games of 2048 stepped in lockstep, each board a uint64 bitboard
+    # (see bitboard.py). A move that doesn't change a board leaves it as it
+    # is with no spawn, exactly like GameState.move; finished games just
+    # stop changing.
+    def __init__(self, n, seed=None):
+        _require_numpy()
+        self.rng = np.random.default_rng(seed)
+        self.boards = np.zeros(n, dtype=np.uint64)
+        self.scores = np.zeros(n, dtype=np.int64)
+        self.moves = np.zeros(n, dtype=np.int64)
+        self.boards = add_random_tiles(self.boards, self.rng)
+        self.boards = add_random_tiles(self.boards, self.rng)
+
+    def __len__(self):
+        return len(self.boards)
+
+    def move(self, directions):
+        # Plays one move on every board: a direction (code or name) for all
+        # of them, or an array of codes, one per board. Returns the boolean
+        # array of the boards that moved.
+        directions = np.broadcast_to(
+            bitboard.DIRECTIONS.index(directions) if isinstance(directions, str) else directions,
+            self.boards.shape)
+        new_boards = self.boards.copy()
+        gained = np.zeros_like(self.scores)
+        for d in range(4):
+            selected = np.flatnonzero(directions == d)
+            if len(selected):
+                new_boards[selected], gained[selected] = move_boards(self.boards[selected], d)
+        moved = new_boards != self.boards
+        self.scores += np.where(moved, gained, 0)
+        self.moves += moved
+        self.boards = add_random_tiles(new_boards, self.rng, moved)
+        return moved
+
+    def alive(self):
+        # Boolean array of the games that still have a legal move
+        return legal_moves(self.boards).any(axis=1)
+
+    def max_tiles(self):
+        return max_tiles(self.boards)
+
+# Batched policies: (boards, legal (N, 4) booleans, rng) -> direction codes
+
+def random_policy(boards, legal, rng):
+    # A random legal move: the legal direction with the biggest random key
+    return np.where(legal, rng.random(legal.shape), -1.0).argmax(axis=1)
+
+def greedy_policy(boards, legal, rng):
+    scores = np.stack([move_boards(boards, d)[1] for d in range(4)], axis=1)
+    keys = np.where(legal, scores + rng.random(legal.shape), -1.0)
+    return keys.argmax(axis=1)
+
+def corner_policy(boards, legal, rng):
+    # First legal move out of UP, LEFT, RIGHT, DOWN
+    order = np.array([UP, LEFT, RIGHT, DOWN])
+    return order[legal[:, order].argmax(axis=1)]
+
+POLICIES = {"random": random_policy, "greedy": greedy_policy, "corner": corner_policy}
+
+def play_games(n, policy, seed=None):
+    # Plays n games to the end with a batched policy; returns the BatchGames.
+    # Each step works out all four moves of the games still going once and
+    # uses them both to find the legal moves and to play the chosen one.
+    games = BatchGames(n, seed)
+    live = np.arange(n)
+    while len(live):
+        boards = games.boards[live]
+        results = [move_boards(boards, d) for d in range(4)]
+        moved = np.stack([result[0] for result in results])  # (4, N)
+        gained = np.stack([result[1] for result in results])
+        legal = (moved != boards).T
+        going = legal.any(axis=1)
+        if not going.all():
+            live, boards, legal = live[going], boards[going], legal[going]
+            moved, gained = moved[:, going], gained[:, going]
+        if not len(live):
+            break
+        directions = policy(boards, legal, games.rng)
+        rows = np.arange(len(live))
+        games.scores[live] += gained[directions, rows]
+        games.moves[live] += 1
+        games.boards[live] = add_random_tiles(moved[directions, rows], games.rng)
+    return games
@@ -0,0 +1,180 @@
+import random
+
+# A 4x4 board packed into one integer: cell (i, j) holds the exponent of its
+# tile (0 = empty, 1 = 2, 2 = 4, ... 15 = 32768) in the four bits starting
+# at bit 16 * i + 4 * j, so each 16-bit chunk is a row with its leftmost
+# cell in the low bits
+
+DIRECTIONS = ("UP", "DOWN", "LEFT", "RIGHT")
+MAX_EXPONENT = 15
+EMPTY = 0
+
+def reverse_row(row):
+    return (row >> 12) | ((row >> 4) & 0x00F0) | ((row << 4) & 0x0F00) | ((row << 12) & 0xF000)
+
+def slide_row_left(row):
+    # (row after sliding left, score gained) for one 16-bit row. Each tile
+    # merges at most once per move; two 32768 tiles stay as they are.
+    tiles = [(row >> (4 * k)) & 0xF for k in range(4)]
+    tiles = [t for t in tiles if t]
+    result = []
+    score = 0
+    k = 0
+    while k < len(tiles):
+        if k + 1 < len(tiles) and tiles[k] == tiles[k + 1] and tiles[k] < MAX_EXPONENT:
+            result.append(tiles[k] + 1)
+            score += 1 << (tiles[k] + 1)
+            k += 2
+        else:
+            result.append(tiles[k])
+            k += 1
+    return sum(t << (4 * k) for k, t in enumerate(result)), score
+
+def row_to_column(row):
+    # A 16-bit row laid out as column 0 of a board
+    return (row & 0xF) | ((row & 0xF0) << 12) | ((row & 0xF00) << 24) | ((row & 0xF000) << 36)
+
+# Every possible row answered once up front: the row after a left or right
+# move, the same for a column moving up or down (already laid out as
+# column 0 of a board), and the score the move earns, which is the same
+# both ways round
+ROW_LEFT = [0] * 65536
+ROW_RIGHT = [0] * 65536
+ROW_SCORE = [0] * 65536
+for _row in range(65536):
+    ROW_LEFT[_row], ROW_SCORE[_row] = slide_row_left(_row)
+for _row in range(65536):
+    ROW_RIGHT[_row] = reverse_row(ROW_LEFT[reverse_row(_row)])
+COLUMN_UP = [row_to_column(row) for row in ROW_LEFT]
+COLUMN_DOWN = [row_to_column(row) for row in ROW_RIGHT]
+del _row
+
+def transpose(board):
+    # Swaps rows and columns, so UP and DOWN can read columns as rows
+    a1 = board & 0xF0F00F0FF0F00F0F
+    a2 = board & 0x0000F0F00000F0F0
+    a3 = board & 0x0F0F00000F0F0000
+    a = a1 | (a2 << 12) | (a3 >> 12)
+    b1 = a & 0xFF00FF0000FF00FF
+    b2 = a & 0x00FF00FF00000000
+    b3 = a & 0x00000000FF00FF00
+    return b1 | (b2 >> 24) | (b3 << 24)
+
+# Each move returns (new board, score gained); the board comes back
+# unchanged if the move does nothing
+
+def move_left(board):
+    r0 = board & 0xFFFF
+    r1 = (board >> 16) & 0xFFFF
+    r2 = (board >> 32) & 0xFFFF
+    r3 = board >> 48
+    return (ROW_LEFT[r0] | (ROW_LEFT[r1] << 16) | (ROW_LEFT[r2] << 32) | (ROW_LEFT[r3] << 48),
+            ROW_SCORE[r0] + ROW_SCORE[r1] + ROW_SCORE[r2] + ROW_SCORE[r3])
+
+def move_right(board):
+    r0 = board & 0xFFFF
+    r1 = (board >> 16) & 0xFFFF
+    r2 = (board >> 32) & 0xFFFF
+    r3 = board >> 48
+    return (ROW_RIGHT[r0] | (ROW_RIGHT[r1] << 16) | (ROW_RIGHT[r2] << 32) | (ROW_RIGHT[r3] << 48),
+            ROW_SCORE[r0] + ROW_SCORE[r1] + ROW_SCORE[r2] + ROW_SCORE[r3])
+
+def move_up(board):
+    # Rows of the transposed board are the columns, top cell first
+    t = transpose(board)
+    c0 = t & 0xFFFF
+    c1 = (t >> 16) & 0xFFFF
+    c2 = (t >> 32) & 0xFFFF
+    c3 = t >> 48
+    return (COLUMN_UP[c0] | (COLUMN_UP[c1] << 4) | (COLUMN_UP[c2] << 8) | (COLUMN_UP[c3] << 12),
+            ROW_SCORE[c0] + ROW_SCORE[c1] + ROW_SCORE[c2] + ROW_SCORE[c3])
+
+def move_down(board):
+    t = transpose(board)
+    c0 = t & 0xFFFF
+    c1 = (t >> 16) & 0xFFFF
+    c2 = (t >> 32) & 0xFFFF
+    c3 = t >> 48
+    return (COLUMN_DOWN[c0] | (COLUMN_DOWN[c1] << 4) | (COLUMN_DOWN[c2] << 8) | (COLUMN_DOWN[c3] << 12),
+            ROW_SCORE[c0] + ROW_SCORE[c1] + ROW_SCORE[c2] + ROW_SCORE[c3])
+
+MOVES = {"UP": move_up, "DOWN": move_down, "LEFT": move_left, "RIGHT": move_right}
+
+def move(board, direction):
+    return MOVES[direction](board)
+
+def empty_cells(board):
+    # Indexes (4 * i + j) of the empty cells
+    return [k for k in range(16) if not (board >> (4 * k)) & 0xF]
+
+def add_random_tile(board, rng=random):
+    # A 2 (or a 4, one time in ten) dropped on a random empty cell
+    cells = empty_cells(board)
+    if not cells:
+        return board
+    k = rng.choice(cells)
+    return board | ((1 if rng.random() < 0.9 else 2) << (4 * k))
+
+def can_move(board):
+    return any(MOVES[direction](board)[0] != board for direction in DIRECTIONS)
+
+def max_tile(board):
+    return 1 << max((board >> (4 * k)) & 0xF for k in range(16)) if board else 0
+
+def exponents(board):
+    # The 16 tile exponents in row-major order
+    return [(board >> (4 * k)) & 0xF for k in range(16)]
+
+# Cell indexes (4 * i + j) of every line, listed in the direction its tiles slide
+LINES = {
+    "LEFT": [[4 * i + j for j in range(4)] for i in range(4)],
+    "RIGHT": [[4 * i + j for j in range(3, -1, -1)] for i in range(4)],
+    "UP": [[4 * i + j for i in range(4)] for j in range(4)],
+    "DOWN": [[4 * i + j for i in range(3, -1, -1)] for j in range(4)],
+}
+
+def line_slides(cells, lines, max_exponent=None):
+    # Where every tile goes in a move, for the tile exponents of a board in
+    # row-major order and the lines of the direction (as in LINES): one
+    # (source cell, destination cell, exponent, merged) per tile, where
+    # merged means it combines with the other tile landing on that cell.
+    # Tiles that stay put are included, with source == destination.
+    slides = []
+    for line in lines:
+        tiles = [k for k in line if cells[k]]
+        t = 0
+        for destination in line:
+            if t == len(tiles):
+                break
+            exponent = cells[tiles[t]]
+            if (t + 1 < len(tiles) and cells[tiles[t + 1]] == exponent
+                    and (max_exponent is None or exponent < max_exponent)):
+                slides.append((tiles[t], destination, exponent, True))
+                slides.append((tiles[t + 1], destination, exponent, True))
+                t += 2
+            else:
+                slides.append((tiles[t], destination, exponent, False))
+                t += 1
+    return slides
+
+def slides(board, direction):
+    # The tile movements behind move(board, direction), for animating it
+    return line_slides(exponents(board), LINES[direction], MAX_EXPONENT)
+
+def encode(grid):
+    # Board for a 4x4 list of tile values (0, 2, 4, ...)
+    board = 0
+    for i in range(4):
+        for j in range(4):
+            if grid[i][j]:
+                board |= (grid[i][j].bit_length() - 1) << (16 * i + 4 * j)
+    return board
+
+def decode(board):
+    # 4x4 list of tile values for a board
+    grid = [[0] * 4 for _ in range(4)]
+    for i in range(4):
+        for j in range(4):
+            exponent = (board >> (16 * i + 4 * j)) & 0xF
+            grid[i][j] = 1 << exponent if exponent else 0
+    return grid
@@ -0,0 +1,135 @@
+import time
+from collections import OrderedDict
+import bitboard
+
+# Heuristic weights, per row or column
+LOST_PENALTY = 200000.0
+MONOTONICITY_POWER = 4.0
+MONOTONICITY_WEIGHT = 47.0
+SUM_POWER = 3.5
+SUM_WEIGHT = 11.0
+MERGES_WEIGHT = 700.0
+EMPTY_WEIGHT = 270.0
+
+# Spawns less likely than this (over the whole path from the root) aren't
+# worth searching below; their board is scored as it stands
+MIN_PROBABILITY = 0.0001
+
+def row_heuristic(row):
+    # Rewards empty cells, neighbours that could merge and rows that rise or
+    # fall steadily; penalises big tiles in general
+    tiles = [(row >> (4 * k)) & 0xF for k in range(4)]
+    empty = tiles.count(0)
+    merges = 0
+    previous = 0
+    run = 0
+    for tile in tiles:
+        if not tile:
+            continue
+        if tile == previous:
+            run += 1
+        elif run:
+            merges += 1 + run
+            run = 0
+        previous = tile
+    if run:
+        merges += 1 + run
+    left = right = 0.0
+    for k in range(3):
+        a = tiles[k] ** MONOTONICITY_POWER
+        b = tiles[k + 1] ** MONOTONICITY_POWER
+        if tiles[k] > tiles[k + 1]:
+            left += a - b
+        else:
+            right += b - a
+    size = sum(tile ** SUM_POWER for tile in tiles)
+    return (LOST_PENALTY + EMPTY_WEIGHT * empty + MERGES_WEIGHT * merges
+            - MONOTONICITY_WEIGHT * min(left, right) - SUM_WEIGHT * size)
+
+ROW_HEURISTIC = [row_heuristic(row) for row in range(65536)]
+
+def heuristic(board):
+    t = bitboard.transpose(board)
+    h = ROW_HEURISTIC
+    return (h[board & 0xFFFF] + h[(board >> 16) & 0xFFFF] + h[(board >> 32) & 0xFFFF] + h[board >> 48]
+            + h[t & 0xFFFF] + h[(t >> 16) & 0xFFFF] + h[(t >> 32) & 0xFFFF] + h[t >> 48])
+
+class OutOfTime(Exception):
+    pass
+
+class ExpectimaxAI:
+    # Picks 2048 moves by expectimax: the player's moves are max nodes and
+    # each spawn (a 2 nine times in ten, else a 4, on any empty cell) is a
+    # chance node. Searches deepen one level at a time until the time budget
+    # runs out, and the move from the deepest finished search is played.
+    def __init__(self, time_budget=0.010, max_depth=None, cache_size=100000):
+        self.time_budget = time_budget  # seconds per move
+        self.max_depth = max_depth  # None picks a depth from the empty cells
+        # board << 4 | depth -> expected score, oldest use first
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.deadline = None
+        self.nodes = 0
+        self.depth = 0  # depth of the search that chose the last move
+
+    def depth_for(self, board):
+        # Few empty cells means few spawns to average over, so go deeper
+        empty = len(bitboard.empty_cells(board))
+        if empty >= 8:
+            return 2
+        if empty >= 4:
+            return 3
+        return 4
+
+    def best_move(self, board):
+        # The direction to play, or None if no move changes the board
+        self.deadline = time.perf_counter() + self.time_budget
+        self.nodes = 0
+        moves = [(direction, bitboard.MOVES[direction](board)[0]) for direction in bitboard.DIRECTIONS]
+        moves = [(direction, moved) for direction, moved in moves if moved != board]
+        if not moves:
+            return None
+        best = moves[0][0]
+        target = self.max_depth or self.depth_for(board)
+        for depth in range(1, target + 1):
+            try:
+                values = [(self.chance_node(moved, depth, 1.0), direction) for direction, moved in moves]
+            except OutOfTime:
+                break
+            best = max(values)[1]
+            self.depth = depth
+        return best
+
+    def max_node(self, board, depth, probability):
+        best = 0.0
+        for move in (bitboard.move_up, bitboard.move_down, bitboard.move_left, bitboard.move_right):
+            moved = move(board)[0]
+            if moved != board:
+                value = self.chance_node(moved, depth, probability)
+                if value > best:
+                    best = value
+        return best
+
+    def chance_node(self, board, depth, probability):
+        self.nodes += 1
+        if depth == 0 or probability < MIN_PROBABILITY:
+            return heuristic(board)
+        if time.perf_counter() > self.deadline:
+            raise OutOfTime
+        key = board << 4 | depth
+        cache = self.cache
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+        cells = bitboard.empty_cells(board)
+        share = probability / len(cells)
+        total = 0.0
+        for k in cells:
+            shift = 4 * k
+            total += 0.9 * self.max_node(board | (1 << shift), depth - 1, share * 0.9)
+            total += 0.1 * self.max_node(board | (2 << shift), depth - 1, share * 0.1)
+        value = total / len(cells)
+        cache[key] = value
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return value
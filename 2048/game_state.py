@@ -0,0 +1,52 @@
+import random
+import bitboard
+from grid_engine import GridEngine
+
+class GameState:
+    # The rules of one 2048 game with no display attached: spawning, moves,
+    # merges, score and game over. Spawns come from `rng` if one is given,
+    # otherwise from a random.Random seeded with `seed` (a fresh 64-bit seed
+    # if that is None too), which replay.py can turn back into the same game.
+    def __init__(self, rng=None, size=4, seed=None):
+        if rng is None:
+            seed = random.getrandbits(64) if seed is None else seed
+            rng = random.Random(seed)
+        self.rng = rng
+        self.seed = seed  # None when the caller supplied the rng
+        # Direction codes (indexes into DIRECTIONS) of the moves that
+        # changed the board, in order
+        self.history = bytearray()
+        self.size = size
+        # The classic 4x4 board is one integer of tile exponents (see
+        # bitboard.py); other sizes are bytes of exponents (see grid_engine.py)
+        self.engine = bitboard if size == 4 else GridEngine(size)
+        self.board = self.engine.EMPTY
+        self.score = 0
+        self.moves = 0
+        self.add_new_tile()
+        self.add_new_tile()
+
+    @property
+    def grid(self):
+        return self.engine.decode(self.board)
+
+    def add_new_tile(self):
+        self.board = self.engine.add_random_tile(self.board, self.rng)
+
+    def move(self, direction):
+        # Plays a move; False if it doesn't change the board (nothing spawns)
+        board, score = self.engine.move(self.board, direction)
+        if board == self.board:
+            return False
+        self.board = board
+        self.score += score
+        self.moves += 1
+        self.history.append(self.engine.DIRECTIONS.index(direction))
+        self.add_new_tile()
+        return True
+
+    def is_over(self):
+        return not self.engine.can_move(self.board)
+
+    def max_tile(self):
+        return self.engine.max_tile(self.board)
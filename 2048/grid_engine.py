@@ -0,0 +1,86 @@
+import random
+from bitboard import line_slides
+
+class GridEngine:
+    # 2048 rules for an n x n board (2 to 16), with the same functions as
+    # the bitboard module so GameState can use either. A board is a bytes
+    # object of n * n tile exponents in row-major order (0 = empty), so it
+    # is immutable, hashable and compares like the 4x4 bitboard integers.
+    # Every move touches each cell a constant number of times.
+    DIRECTIONS = ("UP", "DOWN", "LEFT", "RIGHT")
+
+    def __init__(self, size):
+        if not 2 <= size <= 16:
+            raise ValueError(f"Grid size must be between 2 and 16, not {size}")
+        n = self.size = size
+        self.EMPTY = bytes(n * n)
+        rows = [[i * n + j for j in range(n)] for i in range(n)]
+        columns = [[i * n + j for i in range(n)] for j in range(n)]
+        # Cell indexes of every line, listed in the direction tiles slide
+        self.lines = {
+            "LEFT": rows,
+            "RIGHT": [row[::-1] for row in rows],
+            "UP": columns,
+            "DOWN": [column[::-1] for column in columns],
+        }
+
+    def move(self, board, direction):
+        # (new board, score gained); the board comes back unchanged if the
+        # move does nothing. Each tile merges at most once per move.
+        cells = bytearray(board)
+        score = 0
+        for line in self.lines[direction]:
+            tiles = [board[k] for k in line if board[k]]
+            if not tiles:
+                continue
+            merged = []
+            t = 0
+            while t < len(tiles):
+                if t + 1 < len(tiles) and tiles[t] == tiles[t + 1]:
+                    merged.append(tiles[t] + 1)
+                    score += 1 << (tiles[t] + 1)
+                    t += 2
+                else:
+                    merged.append(tiles[t])
+                    t += 1
+            merged += [0] * (len(line) - len(merged))
+            for k, exponent in zip(line, merged):
+                cells[k] = exponent
+        return bytes(cells), score
+
+    def slides(self, board, direction):
+        # The tile movements behind move(board, direction), for animating it
+        return line_slides(board, self.lines[direction])
+
+    def empty_cells(self, board):
+        return [k for k, exponent in enumerate(board) if not exponent]
+
+    def add_random_tile(self, board, rng=random):
+        # A 2 (or a 4, one time in ten) dropped on a random empty cell
+        cells = self.empty_cells(board)
+        if not cells:
+            return board
+        k = rng.choice(cells)
+        return board[:k] + bytes((1 if rng.random() < 0.9 else 2,)) + board[k + 1:]
+
+    def can_move(self, board):
+        if 0 in board:
+            return True
+        n = self.size
+        for k, exponent in enumerate(board):
+            if k % n < n - 1 and board[k + 1] == exponent:
+                return True
+            if k + n < n * n and board[k + n] == exponent:
+                return True
+        return False
+
+    def max_tile(self, board):
+        top = max(board)
+        return 1 << top if top else 0
+
+    def exponents(self, board):
+        return list(board)
+
+    def decode(self, board):
+        n = self.size
+        return [[1 << e if e else 0 for e in board[i * n:i * n + n]] for i in range(n)]
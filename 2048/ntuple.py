@@ -0,0 +1,155 @@
+import argparse
+import os
+import random
+import time
+import bitboard
+from optional_numpy import np, require_numpy
+
+WEIGHTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ntuple_weights.npy")
+
+# Each tuple reads four cells of a board as one 16-bit index into its own
+# 65,536-entry weight table: the outer row, the second row, and the 2x2
+# squares in the corner, on the edge and in the middle. Every tuple is read
+# on all eight rotations and reflections of the board, sharing its weights.
+TUPLES = 5
+TABLE_SIZE = 65536
+
+def _flip_rows(board):
+    # Mirrors the board left to right
+    return (((board & 0x000F000F000F000F) << 12) | ((board & 0x00F000F000F000F0) << 4)
+            | ((board >> 4) & 0x00F000F000F000F0) | ((board >> 12) & 0x000F000F000F000F))
+
+def _flip_columns(board):
+    # Mirrors the board top to bottom
+    return ((board >> 48) | ((board >> 16) & 0xFFFF0000) | ((board << 16) & 0xFFFF00000000)
+            | ((board << 48) & 0xFFFF000000000000))
+
+def symmetries(board):
+    t = bitboard.transpose(board)
+    h = _flip_rows(board)
+    v = _flip_columns(board)
+    return (board, h, v, _flip_columns(h), t, _flip_rows(t), _flip_columns(t), _flip_rows(_flip_columns(t)))
+
+def features(board):
+    # Positions in the flattened weight array read for a board: TUPLES
+    # indexes for each of its eight symmetries
+    indexes = []
+    for b in symmetries(board):
+        indexes.append(b & 0xFFFF)
+        indexes.append(TABLE_SIZE + ((b >> 16) & 0xFFFF))
+        indexes.append(2 * TABLE_SIZE + ((b & 0xFF) | ((b >> 8) & 0xFF00)))
+        indexes.append(3 * TABLE_SIZE + (((b >> 4) & 0xFF) | ((b >> 12) & 0xFF00)))
+        indexes.append(4 * TABLE_SIZE + (((b >> 20) & 0xFF) | ((b >> 28) & 0xFF00)))
+    return indexes
+
+def _require_numpy():
+    require_numpy("The n-tuple network")
+
+class NTupleNetwork:
+    # Learned value of a 2048 afterstate (the board right after a move,
+    # before the spawn) as a sum of n-tuple weights. The weights are one
+    # flat float32 array; loaded from disk it is memory-mapped, so it opens
+    # instantly and processes using the same file share its pages.
+    def __init__(self, weights):
+        self.weights = weights
+        # Indexing a memoryview gives plain floats, much faster than numpy scalars
+        self.table = memoryview(weights)
+
+    @classmethod
+    def zeros(cls):
+        _require_numpy()
+        return cls(np.zeros(TUPLES * TABLE_SIZE, dtype=np.float32))
+
+    @classmethod
+    def load(cls, path=WEIGHTS_FILE):
+        _require_numpy()
+        return cls(np.load(path, mmap_mode="r"))
+
+    def save(self, path=WEIGHTS_FILE):
+        # A training run killed mid-save keeps its old weights: the new ones
+        # only replace them once fully written (np.save adds ".npy" to
+        # names without it, hence the suffix)
+        tmp_path = path + ".tmp.npy"
+        np.save(tmp_path, np.asarray(self.weights))
+        os.replace(tmp_path, path)
+
+    def value(self, board):
+        table = self.table
+        return sum(table[i] for i in features(board))
+
+    def update(self, board, delta):
+        # Adds delta to every weight the board reads
+        table = self.table
+        for i in features(board):
+            table[i] += delta
+
+    def choose(self, board):
+        # (direction, afterstate, reward) of the move with the best reward
+        # plus afterstate value, or None if no move changes the board
+        best = None
+        best_value = None
+        for direction in bitboard.DIRECTIONS:
+            after, reward = bitboard.MOVES[direction](board)
+            if after != board:
+                value = reward + self.value(after)
+                if best is None or value > best_value:
+                    best, best_value = (direction, after, reward), value
+        return best
+
+    def best_move(self, board):
+        # Same interface as ExpectimaxAI, so it can drive auto-play
+        choice = self.choose(board)
+        return choice[0] if choice else None
+
+def train_game(network, alpha, rng):
+    # Plays one game greedily with the network and applies TD(0) updates to
+    # afterstate values as it goes: V(a) moves toward r' + V(a'), where a'
+    # and r' are the next afterstate and reward, by alpha times the error on
+    # every weight involved. Returns (score, max tile).
+    board = bitboard.add_random_tile(bitboard.add_random_tile(0, rng), rng)
+    score = 0
+    previous = None
+    while True:
+        choice = network.choose(board)
+        if choice is None:
+            break
+        _, after, reward = choice
+        if previous is not None:
+            network.update(previous, alpha * (reward + network.value(after) - network.value(previous)))
+        previous = after
+        score += reward
+        board = bitboard.add_random_tile(after, rng)
+    if previous is not None:
+        network.update(previous, -alpha * network.value(previous))
+    return score, bitboard.max_tile(board)
+
+def train(games, alpha=0.0025, path=WEIGHTS_FILE, resume=False, seed=None, report_every=100):
+    network = NTupleNetwork(np.array(np.load(path))) if resume else NTupleNetwork.zeros()
+    rng = random.Random(seed)
+    scores = []
+    reached = 0
+    start = time.perf_counter()
+    for game in range(1, games + 1):
+        score, tile = train_game(network, alpha, rng)
+        scores.append(score)
+        reached += tile >= 2048
+        if game % report_every == 0 or game == games:
+            recent = scores[-report_every:]
+            print(f"game {game}: mean score {sum(recent) / len(recent):.0f} over the last {len(recent)}, "
+                  f"{reached} reached 2048 so far, {game / (time.perf_counter() - start):.1f} games/sec")
+            network.save(path)
+    return network
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the 2048 n-tuple network by TD learning")
+    parser.add_argument("--games", type=int, default=10000, help="training games to play")
+    parser.add_argument("--alpha", type=float, default=0.0025, help="learning rate")
+    parser.add_argument("--weights", default=WEIGHTS_FILE, help="where the weights are saved")
+    parser.add_argument("--resume", action="store_true", help="continue from the saved weights")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the tile spawns")
+    args = parser.parse_args()
+    _require_numpy()
+    train(args.games, args.alpha, args.weights, args.resume, args.seed)
+
+if __name__ == "__main__":
+    main()
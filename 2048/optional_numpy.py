@@ -0,0 +1,9 @@
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; only the batched engine and the n-tuple network need it
+    np = None
+
+def require_numpy(feature):
+    # Call before using np, with what needs it for the error message
+    if np is None:
+        raise ImportError(f"{feature} needs numpy (pip install numpy)")
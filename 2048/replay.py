@@ -0,0 +1,159 @@
+import argparse
+import struct
+import time
+from bitboard import DIRECTIONS
+from game_state import GameState
+
+# A replay is everything needed to play a game again exactly: the seed of
+# its tile spawns, the board size and the moves. A file is a fixed header
+# followed by the moves packed four to a byte, two bits each (the index of
+# the direction in DIRECTIONS), the first move in the lowest bits. Only
+# moves that changed the board are kept; the others spawn nothing, so they
+# don't touch the rng.
+MAGIC = b"2048"
+VERSION = 1
+HEADER = struct.Struct("<4sBBQI")  # magic, version, size, seed, move count
+
+# ReplayPlayer keeps the state every this many moves, so a jump never
+# replays more than this many moves
+CHECKPOINT_EVERY = 256
+
+def pack_moves(codes):
+    data = bytearray((len(codes) + 3) // 4)
+    for i, code in enumerate(codes):
+        data[i >> 2] |= code << (2 * (i & 3))
+    return bytes(data)
+
+def unpack_moves(data, count):
+    return bytes((data[i >> 2] >> (2 * (i & 3))) & 3 for i in range(count))
+
+class Replay:
+    def __init__(self, seed, size=4, moves=b""):
+        self.seed = seed
+        self.size = size
+        self.moves = bytes(moves)  # direction codes, one per move
+
+    @classmethod
+    def of(cls, game):
+        # The replay of a GameState played so far
+        if game.seed is None:
+            raise ValueError("Only games that GameState seeded itself can be replayed")
+        return cls(game.seed, game.size, game.history)
+
+    @classmethod
+    def record(cls, directions, seed=0, size=4):
+        # Plays direction names on a new game, e.g. to build a repro case;
+        # the ones that don't change the board are dropped
+        game = GameState(size=size, seed=seed)
+        for direction in directions:
+            game.move(direction)
+        return cls.of(game)
+
+    def __len__(self):
+        return len(self.moves)
+
+    def to_bytes(self):
+        return HEADER.pack(MAGIC, VERSION, self.size, self.seed, len(self.moves)) + pack_moves(self.moves)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if len(data) < HEADER.size:
+            raise ValueError("Not a 2048 replay: too short")
+        magic, version, size, seed, count = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Not a 2048 replay")
+        if version != VERSION:
+            raise ValueError(f"Unsupported replay version {version}")
+        body = data[HEADER.size:]
+        if len(body) != (count + 3) // 4:
+            raise ValueError(f"Replay should have {count} moves but is {len(body)} bytes long")
+        return cls(seed, size, unpack_moves(body, count))
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+    def new_game(self):
+        return GameState(size=self.size, seed=self.seed)
+
+    def play(self, game, until=None):
+        # Fast-forwards a game (new_game() or a Game2048 with the same seed
+        # and size) from the move it is on to move `until` (default: the end)
+        for i in range(game.moves, len(self.moves) if until is None else until):
+            if not game.move(DIRECTIONS[self.moves[i]]):
+                raise ValueError(f"Move {i + 1} of the replay doesn't change the board")
+        return game
+
+class ReplayPlayer:
+    # Seeks back and forth through a replay without drawing anything. The
+    # board, score and rng state are saved every CHECKPOINT_EVERY moves on
+    # the way forward; a seek restores the nearest one at or before the
+    # target (unless the game is already between the two) and plays on
+    # from there.
+    def __init__(self, replay):
+        self.replay = replay
+        self.game = replay.new_game()
+        self.checkpoints = {0: self.snapshot()}
+
+    @property
+    def position(self):
+        return self.game.moves
+
+    def snapshot(self):
+        return self.game.board, self.game.score, self.game.rng.getstate()
+
+    def restore(self, position):
+        game = self.game
+        game.board, game.score, state = self.checkpoints[position]
+        game.rng.setstate(state)
+        game.moves = position
+        game.history[:] = self.replay.moves[:position]
+
+    def seek(self, position):
+        # Moves to just after move `position` (0 is the start); returns the game
+        position = max(0, min(position, len(self.replay)))
+        nearest = position - position % CHECKPOINT_EVERY
+        while nearest not in self.checkpoints:
+            nearest -= CHECKPOINT_EVERY
+        if not nearest <= self.position <= position:
+            self.restore(nearest)
+        game = self.game
+        moves = self.replay.moves
+        while game.moves < position:
+            if not game.move(DIRECTIONS[moves[game.moves]]):
+                raise ValueError(f"Move {game.moves + 1} of the replay doesn't change the board")
+            if game.moves % CHECKPOINT_EVERY == 0:
+                self.checkpoints.setdefault(game.moves, self.snapshot())
+        return game
+
+    def step(self, count=1):
+        return self.seek(self.position + count)
+
+def main():
+    parser = argparse.ArgumentParser(description="Show a 2048 replay at any move")
+    parser.add_argument("path", help="replay file")
+    parser.add_argument("--move", type=int, default=None, help="show the board after this move (default: the last)")
+    parser.add_argument("--moves", action="store_true", help="also list the moves")
+    args = parser.parse_args()
+
+    replay = Replay.load(args.path)
+    print(f"{replay.size}x{replay.size} game, seed {replay.seed}, {len(replay)} moves")
+    if args.moves:
+        print(" ".join(DIRECTIONS[code][0] for code in replay.moves))
+    player = ReplayPlayer(replay)
+    start = time.perf_counter()
+    game = player.seek(len(replay) if args.move is None else args.move)
+    print(f"After move {game.moves} (reached in {1000 * (time.perf_counter() - start):.1f} ms): "
+          f"score {game.score}, max tile {game.max_tile()}")
+    grid = game.grid
+    width = len(str(max(max(row) for row in grid)))
+    for row in grid:
+        print(" ".join(f"{value or '.':>{width}}" for value in row))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import argparse
+import random
+import statistics
+import time
+from collections import Counter
+from multiprocessing import Pool
+import bitboard
+from game_state import GameState
+
+# Policies take (board, rng) and return the direction to play; they are only
+# asked while some move is still possible
+
+def random_policy(board, rng):
+    return rng.choice([d for d in bitboard.DIRECTIONS if bitboard.MOVES[d](board)[0] != board])
+
+def greedy_policy(board, rng):
+    # The move that scores the most right now, ties broken at random
+    options = [(bitboard.MOVES[d](board), rng.random(), d) for d in bitboard.DIRECTIONS]
+    return max(((score, tie, d) for (moved, score), tie, d in options if moved != board))[2]
+
+def corner_policy(board, rng):
+    # The usual human strategy: keep the big tiles in the top-left corner
+    for direction in ("UP", "LEFT", "RIGHT", "DOWN"):
+        if bitboard.MOVES[direction](board)[0] != board:
+            return direction
+
+POLICIES = ("random", "greedy", "corner", "expectimax", "ntuple")
+
+policy = None
+
+def init_worker(name, time_budget, weights=None):
+    global policy
+    if name == "expectimax":
+        from expectimax import ExpectimaxAI
+        ai = ExpectimaxAI(time_budget=time_budget)
+        policy = lambda board, rng: ai.best_move(board)
+    elif name == "ntuple":
+        # Every worker maps the same weights file, so they share one copy
+        from ntuple import NTupleNetwork
+        network = NTupleNetwork.load(weights) if weights else NTupleNetwork.load()
+        policy = lambda board, rng: network.best_move(board)
+    else:
+        policy = globals()[name + "_policy"]
+
+def play_game(seed):
+    # Runs in a worker: (score, max tile, moves, seconds) for one game
+    rng = random.Random(seed)
+    game = GameState(rng)
+    start = time.perf_counter()
+    while not game.is_over():
+        game.move(policy(game.board, rng))
+    return game.score, game.max_tile(), game.moves, time.perf_counter() - start
+
+def simulate(games, policy_name="random", workers=None, seed=0, time_budget=0.010, chunksize=8, weights=None):
+    # Plays `games` games across a process pool. Game i uses seed + i, so a
+    # run can be repeated exactly with the same seed (expectimax aside,
+    # whose depth depends on timing).
+    scores = []
+    tiles = Counter()
+    moves = 0
+    start = time.perf_counter()
+    with Pool(workers, initializer=init_worker, initargs=(policy_name, time_budget, weights)) as pool:
+        for score, tile, game_moves, _ in pool.imap_unordered(play_game, range(seed, seed + games), chunksize):
+            scores.append(score)
+            tiles[tile] += 1
+            moves += game_moves
+    return make_report(games, time.perf_counter() - start, scores, tiles, moves)
+
+def make_report(games, wall, scores, tiles, moves):
+    # Score deciles; quantiles needs at least two scores, and with fewer
+    # every decile is the one score (or 0)
+    if len(scores) < 2:
+        deciles = [scores[0] if scores else 0] * 9
+    else:
+        deciles = statistics.quantiles(scores, n=10, method="inclusive")
+    return {
+        "games": games,
+        "seconds": wall,
+        "games_per_sec": games / wall if wall else 0.0,
+        "moves_per_sec": moves / wall if wall else 0.0,
+        "score_mean": sum(scores) / games if games else 0.0,
+        "score_p10": deciles[0],
+        "score_p50": deciles[4],
+        "score_p90": deciles[8],
+        "score_max": max(scores, default=0),
+        "max_tiles": dict(sorted(tiles.items())),
+    }
+
+def simulate_vectorized(games, policy_name="random", seed=0):
+    # The same report from batch_engine, which plays every game in lockstep
+    # on numpy arrays in this process
+    from batch_engine import POLICIES as BATCH_POLICIES, play_games
+
+    start = time.perf_counter()
+    batch = play_games(games, BATCH_POLICIES[policy_name], seed)
+    return make_report(games, time.perf_counter() - start, batch.scores.tolist(),
+                       Counter(batch.max_tiles().tolist()), int(batch.moves.sum()))
+
+def main():
+    parser = argparse.ArgumentParser(description="Play 2048 games headlessly and report how a policy does")
+    parser.add_argument("--games", type=int, default=100, help="number of games to play")
+    parser.add_argument("--policy", default="random", choices=POLICIES, help="how moves are chosen")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("--time-budget", type=float, default=0.010, help="seconds per expectimax move")
+    parser.add_argument("--weights", default=None, help="n-tuple weights file (default: ntuple_weights.npy)")
+    parser.add_argument("--vectorized", action="store_true",
+                        help="play all games at once on numpy arrays (random, greedy and corner only)")
+    args = parser.parse_args()
+
+    if args.vectorized:
+        if args.policy in ("expectimax", "ntuple"):
+            parser.error(f"--vectorized does not support the {args.policy} policy")
+        report = simulate_vectorized(args.games, args.policy, args.seed)
+    else:
+        report = simulate(args.games, args.policy, args.workers, args.seed, args.time_budget, weights=args.weights)
+    print(f"{report['games']} games in {report['seconds']:.2f}s "
+          f"({report['games_per_sec']:.1f} games/sec, {report['moves_per_sec']:.0f} moves/sec)")
+    print(f"Score mean {report['score_mean']:.0f}, p10 {report['score_p10']:.0f}, p50 {report['score_p50']:.0f}, "
+          f"p90 {report['score_p90']:.0f}, max {report['score_max']}")
+    print("Max tile:")
+    for tile, count in report["max_tiles"].items():
+        print(f"  {tile:6d}  {count:6d}  {100 * count / report['games']:5.1f}%")
+
+if __name__ == "__main__":
+    main()
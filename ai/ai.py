@@ -1,4 +1,5 @@
 import random
+from kinarow import check_winner, is_board_full as is_full
 
 def get_best_move(board):
     print("AI is thinking...")
@@ -7,8 +8,8 @@ def get_best_move(board):
         print(row)
     
     available_moves = []
-    for i in range(4):
-        for j in range(4):
+    for i in range(len(board)):
+        for j in range(len(board)):
             if board[i][j] == ' ':
                 available_moves.append((i, j))
     
@@ -18,22 +19,3 @@ def get_best_move(board):
     best_move = random.choice(available_moves)
     print(f"AI chose move: {best_move}")
     return best_move
-
-def check_winner(board):
-    # Check rows and columns
-    for i in range(4):
-        if board[i][0] == board[i][1] == board[i][2] == board[i][3] != ' ':
-            return board[i][0]
-        if board[0][i] == board[1][i] == board[2][i] == board[3][i] != ' ':
-            return board[0][i]
-    
-    # Check diagonals
-    if board[0][0] == board[1][1] == board[2][2] == board[3][3] != ' ':
-        return board[0][0]
-    if board[0][3] == board[1][2] == board[2][1] == board[3][0] != ' ':
-        return board[0][3]
-    
-    return None
-
-def is_full(board):
-    return all(cell != ' ' for row in board for cell in row)
\ No newline at end of file
@@ -0,0 +1,77 @@
+EMPTY = ' '
+
+def popcount(bits):
+    return bin(bits).count("1")
+
+class KInARow:
+    # The rules of tic-tac-toe on an N x N board where k in a row (across,
+    # down or diagonal) wins; k defaults to N. Each player's marks are one
+    # integer with bit row * N + col set for every cell they hold, and every
+    # winning line is a precomputed mask, so a player has won when one of
+    # the masks ANDed with their bits gives the mask back.
+    def __init__(self, size, k=None):
+        self.size = size
+        self.k = size if k is None else k
+        if not 1 <= self.k <= size:
+            raise ValueError(f"Can't get {self.k} in a row on a {size}x{size} board")
+        self.cells = size * size
+        self.full = (1 << self.cells) - 1
+        self.lines = []
+        for row in range(size):
+            for col in range(size):
+                for d_row, d_col in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    end_row = row + d_row * (self.k - 1)
+                    end_col = col + d_col * (self.k - 1)
+                    if end_row < size and 0 <= end_col < size:
+                        self.lines.append(sum(1 << ((row + d_row * s) * size + col + d_col * s)
+                                              for s in range(self.k)))
+        # The lines through each cell, enough to check the mark just placed
+        self.lines_through = [[line for line in self.lines if line >> cell & 1] for cell in range(self.cells)]
+
+    def bit(self, row, col):
+        return 1 << (row * self.size + col)
+
+    def encode(self, board):
+        # {player: bits} for a list-of-rows board of player names and EMPTY
+        marks = {}
+        for row in range(self.size):
+            for col in range(self.size):
+                player = board[row][col]
+                if player != EMPTY:
+                    marks[player] = marks.get(player, 0) | self.bit(row, col)
+        return marks
+
+    def has_line(self, bits):
+        return any(bits & line == line for line in self.lines)
+
+    def wins_at(self, bits, cell):
+        # Whether the mark on `cell` completes a line; cheaper than has_line
+        # when only that mark is new
+        return any(bits & line == line for line in self.lines_through[cell])
+
+    def empty_cells(self, taken):
+        # Cell indexes (row * N + col) not in `taken`, in reading order
+        return [cell for cell in range(self.cells) if not taken >> cell & 1]
+
+    def winner(self, board):
+        for player, bits in self.encode(board).items():
+            if self.has_line(bits):
+                return player
+        return None
+
+_engines = {}
+
+def engine_for(size, k=None):
+    # One shared KInARow per board size and k, since building the masks
+    # takes a moment on big boards
+    key = (size, k)
+    if key not in _engines:
+        _engines[key] = KInARow(size, k)
+    return _engines[key]
+
+def check_winner(board, k=None):
+    # The player with k in a row on a list-of-rows board of any size, or None
+    return engine_for(len(board), k).winner(board)
+
+def is_board_full(board):
+    return all(cell != EMPTY for row in board for cell in row)
@@ -0,0 +1,125 @@
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; only the array board and batch checks need it
+    np = None
+
+from sudoku_board import DIGIT_CHARS, SudokuBoard, size_for_length
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("ArraySudokuBoard and the batch checks need numpy (pip install numpy)")
+
+def _box_size(boards):
+    # Box size of an (N, n, n) stack: 3 for 9x9 boards, 4 for 16x16, ...
+    return size_for_length(boards.shape[1] * boards.shape[2])
+
+def _box_view(boards):
+    # (N, n, n) -> (N, n, n) where axis 1 is the box and axis 2 the cell inside it
+    count, n = boards.shape[0], boards.shape[1]
+    b = _box_size(boards)
+    return boards.reshape(count, b, b, b, b).transpose(0, 1, 3, 2, 4).reshape(count, n, n)
+
+def batch_units(boards):
+    # All 3n units of each board: (N, 3n, n) with rows, then columns, then boxes
+    _require_numpy()
+    boards = np.asarray(boards, dtype=np.uint8)
+    return np.concatenate((boards, boards.transpose(0, 2, 1), _box_view(boards)), axis=1)
+
+def batch_is_valid(boards):
+    # Boolean (N,) array: no digit repeated in any row, column or box.
+    # Sorting each unit puts duplicates next to each other, which keeps
+    # memory at one byte per cell instead of a one-hot digit axis.
+    units = np.sort(batch_units(boards), axis=2)
+    repeated = (units[:, :, 1:] == units[:, :, :-1]) & (units[:, :, 1:] != 0)
+    return ~repeated.any(axis=(1, 2))
+
+def batch_is_complete(boards):
+    _require_numpy()
+    boards = np.asarray(boards, dtype=np.uint8)
+    return (boards != 0).all(axis=(1, 2))
+
+def batch_is_solved(boards):
+    return batch_is_complete(boards) & batch_is_valid(boards)
+
+def stack_boards(boards):
+    # Stack SudokuBoards of one size (list-backed or array-backed) into one
+    # (N, n, n) array
+    _require_numpy()
+    return np.stack([
+        board.cells if isinstance(board, ArraySudokuBoard) else np.array(board.board, dtype=np.uint8)
+        for board in boards
+    ])
+
+def stack_strings(texts):
+    # (N, n, n) array of boards in text form, all the same size, decoded in
+    # one pass
+    _require_numpy()
+    lookup = np.zeros(256, dtype=np.uint8)
+    for value, ch in enumerate(DIGIT_CHARS):
+        lookup[ord(ch)] = value
+        lookup[ord(ch.lower())] = value
+    data = np.frombuffer("".join(texts).encode("ascii"), dtype=np.uint8)
+    n = size_for_length(len(texts[0])) ** 2 if texts else 9
+    return lookup[data].reshape(len(texts), n, n)
+
+class ArraySudokuBoard:
+    # SudokuBoard with the grid stored as a uint8 n x n array and vectorized
+    # validation, for tooling that checks large numbers of boards
+    def __init__(self, cells=None, box_size=3):
+        _require_numpy()
+        self.box_size = box_size
+        self.size = n = box_size * box_size
+        if cells is None:
+            self.cells = np.zeros((n, n), dtype=np.uint8)
+        else:
+            self.cells = np.array(cells, dtype=np.uint8).reshape(n, n)
+        self.solution = None
+
+    @classmethod
+    def from_board(cls, board):
+        array_board = cls(board.board, board.box_size)
+        array_board.solution = board.solution
+        return array_board
+
+    def to_board(self):
+        board = SudokuBoard(self.box_size)
+        for i in range(self.size):
+            for j in range(self.size):
+                board.set_cell(i, j, int(self.cells[i, j]))
+        board.solution = self.solution
+        return board
+
+    @classmethod
+    def from_string(cls, text):
+        text = text.strip()
+        return cls(stack_strings([text])[0], size_for_length(len(text)))
+
+    def to_string(self):
+        return "".join(DIGIT_CHARS[cell] for cell in self.cells.ravel())
+
+    def set_cell(self, row, col, value):
+        self.cells[row, col] = value
+
+    def get_cell(self, row, col):
+        return int(self.cells[row, col])
+
+    @property
+    def board(self):
+        return self.cells.tolist()
+
+    def is_valid(self):
+        return bool(batch_is_valid(self.cells[None])[0])
+
+    def is_complete(self):
+        return bool(self.cells.all())
+
+    def get_empty_cell(self):
+        empty = np.argwhere(self.cells == 0)
+        if not len(empty):
+            return None
+        return int(empty[0][0]), int(empty[0][1])
+
+    def copy(self):
+        new_board = ArraySudokuBoard(self.cells, self.box_size)
+        new_board.solution = self.solution
+        return new_board
@@ -0,0 +1,117 @@
+import statistics
+import sys
+import time
+from multiprocessing import Pool
+from sudoku_board import DIGIT_CHARS, SudokuBoard, size_for_length
+from sudoku_solver import SudokuSolver
+
+solver = None
+
+def init_worker(backend):
+    global solver
+    solver = SudokuSolver(backend)
+
+def parse_puzzle(line):
+    # SudokuBoard for one puzzle line (81 characters for 9x9, '0' or '.'
+    # for blanks), or None if the line is malformed
+    text = line.strip()
+    box_size = size_for_length(len(text))
+    if box_size ** 4 != len(text):
+        return None
+    allowed = "." + DIGIT_CHARS[:box_size * box_size + 1]
+    if any(ch not in allowed for ch in text.upper()):
+        return None
+    return SudokuBoard.from_string(text)
+
+def solve_line(args):
+    # Runs in a worker: (output line, solved, seconds, unique or None).
+    # The output line is the solution, or the input echoed back on failure.
+    line, check_unique = args
+    start = time.perf_counter()
+    board = parse_puzzle(line)
+    if board is None:
+        return line, False, time.perf_counter() - start, None
+    unique = None
+    if check_unique:
+        unique = solver.count_solutions(board, 2) == 1
+    solved = solver.solve_puzzle(board)
+    elapsed = time.perf_counter() - start
+    return (board.to_string() if solved else line), solved, elapsed, unique
+
+def read_puzzles(path):
+    # Streams puzzle lines, skipping blank lines and '#' comments
+    f = sys.stdin if path == "-" else open(path)
+    try:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+# With verify, solutions are checked this many at a time as they come in,
+# so a large corpus is never held in memory
+VERIFY_CHUNK = 4096
+
+def count_invalid(solutions):
+    # Solutions (text form, any mix of sizes) that aren't complete, valid
+    # grids, checked a whole size at a time with the batched numpy checks
+    from array_board import batch_is_solved, stack_strings
+
+    by_length = {}
+    for text in solutions:
+        by_length.setdefault(len(text), []).append(text)
+    return sum(int((~batch_is_solved(stack_strings(texts))).sum()) for texts in by_length.values())
+
+def run_batch(input_path, output_path="-", workers=None, backend="dlx", check_unique=False, chunksize=64,
+              verify=False):
+    # Solves every puzzle in input_path across a process pool and writes the
+    # solutions in input order. A puzzle that is malformed or has no solution
+    # is written back unchanged and counted as a failure. With verify, every
+    # solution is also checked independently of the solver.
+    out = sys.stdout if output_path == "-" else open(output_path, "w")
+    times = []
+    failures = 0
+    not_unique = 0
+    invalid = 0
+    solutions = []  # solved outputs waiting to be verified
+    start = time.perf_counter()
+    try:
+        with Pool(workers, initializer=init_worker, initargs=(backend,)) as pool:
+            tasks = ((line, check_unique) for line in read_puzzles(input_path))
+            for output, solved, elapsed, unique in pool.imap(solve_line, tasks, chunksize):
+                out.write(output + "\n")
+                times.append(elapsed)
+                if not solved:
+                    failures += 1
+                elif verify:
+                    solutions.append(output)
+                    if len(solutions) >= VERIFY_CHUNK:
+                        invalid += count_invalid(solutions)
+                        solutions.clear()
+                if unique is False:
+                    not_unique += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    wall = time.perf_counter() - start
+    # Percentiles p1 to p99; quantiles needs at least two times, and with
+    # fewer every percentile is the one time (or 0)
+    if len(times) < 2:
+        cuts = [times[0] if times else 0.0] * 99
+    else:
+        cuts = statistics.quantiles(times, n=100, method="inclusive")
+    report = {
+        "puzzles": len(times),
+        "failures": failures,
+        "seconds": wall,
+        "puzzles_per_sec": len(times) / wall if wall else 0.0,
+        "p50_ms": cuts[49] * 1000,
+        "p99_ms": cuts[98] * 1000,
+    }
+    if check_unique:
+        report["not_unique"] = not_unique
+    if verify:
+        report["invalid"] = invalid + count_invalid(solutions)
+    return report
@@ -0,0 +1,112 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from batch_solver import parse_puzzle, read_puzzles
+from sudoku_solver import SudokuSolver
+
+PUZZLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "puzzles")
+PUZZLE_SETS = ("easy", "minimal17", "killers")
+
+def load_set(name):
+    return [parse_puzzle(line) for line in read_puzzles(os.path.join(PUZZLE_DIR, name + ".txt"))]
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def benchmark(backend, puzzles, repeat=1):
+    # Solves every puzzle `repeat` times. Timing runs without tracemalloc
+    # (it slows Python down a lot); one extra traced pass measures peak memory.
+    solver = SudokuSolver(backend)
+    times = []
+    nodes = 0
+    solved = 0
+    for _ in range(repeat):
+        for index, puzzle in enumerate(puzzles):
+            random.seed(index)  # same branch order on every run, so node counts are comparable
+            board = puzzle.copy()
+            start = time.perf_counter()
+            ok = solver.solve_puzzle(board)
+            times.append(time.perf_counter() - start)
+            nodes += solver.nodes
+            solved += ok and board.is_complete() and board.is_valid()
+
+    tracemalloc.start()
+    for index, puzzle in enumerate(puzzles):
+        random.seed(index)
+        solver.solve_puzzle(puzzle.copy())
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    total = sum(times)
+    times.sort()
+    runs = len(times)
+    return {
+        "puzzles": len(puzzles),
+        "runs": runs,
+        "solved": solved,
+        "nodes": nodes // repeat,
+        "nodes_per_puzzle": nodes / runs if runs else 0.0,
+        "seconds": total,
+        "solutions_per_sec": solved / total if total else 0.0,
+        "p50_ms": times[runs // 2] * 1000 if runs else 0.0,
+        "max_ms": times[-1] * 1000 if runs else 0.0,
+        "peak_memory_kb": peak / 1024,
+    }
+
+def run(backends, sets, repeat=1):
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": {},
+    }
+    puzzles = {name: load_set(name) for name in sets}
+    for backend in backends:
+        report["results"][backend] = {name: benchmark(backend, puzzles[name], repeat) for name in sets}
+    return report
+
+def print_report(report, baseline=None):
+    # One line per backend and set; with a baseline, also the speedup over it
+    for backend, sets in report["results"].items():
+        for name, result in sets.items():
+            line = (f"{backend:>12} {name:>10}: {result['solved']}/{result['runs']} solved, "
+                    f"{result['nodes_per_puzzle']:.0f} nodes/puzzle, {result['solutions_per_sec']:.1f} solutions/sec, "
+                    f"p50 {result['p50_ms']:.2f} ms, max {result['max_ms']:.2f} ms, "
+                    f"peak {result['peak_memory_kb']:.0f} KiB")
+            old = (baseline or {}).get("results", {}).get(backend, {}).get(name)
+            if old and result["seconds"]:
+                line += f", {old['seconds'] / result['seconds']:.2f}x vs {baseline.get('commit') or 'baseline'}"
+            print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the sudoku solver backends on the bundled puzzle sets")
+    parser.add_argument("--backends", nargs="+", default=list(SudokuSolver.BACKENDS), choices=SudokuSolver.BACKENDS)
+    parser.add_argument("--sets", nargs="+", default=list(PUZZLE_SETS), choices=PUZZLE_SETS)
+    parser.add_argument("--repeat", type=int, default=1, help="timed passes over each set")
+    parser.add_argument("--output", metavar="FILE", help="write the JSON report to FILE")
+    parser.add_argument("--compare", metavar="FILE", help="earlier JSON report to show speedups against")
+    args = parser.parse_args()
+
+    report = run(args.backends, args.sets, args.repeat)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
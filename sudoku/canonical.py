@@ -0,0 +1,119 @@
+import itertools
+import os
+import threading
+
+# Orderings of the 3 bands (or stacks) and of the 3 lines inside one
+TRIPLE_PERMS = list(itertools.permutations(range(3)))
+# All 1296 column orders that keep sudoku validity: stack order x line order in each stack
+COLUMN_ORDERS = [
+    tuple(stacks[s] * 3 + inner[stacks[s]][k] for s in range(3) for k in range(3))
+    for stacks in TRIPLE_PERMS
+    for inner in itertools.product(TRIPLE_PERMS, repeat=3)
+]
+
+def _grid(board):
+    if board.box_size != 3:
+        raise ValueError("Canonical forms are only defined for 9x9 boards")
+    return [row[:] for row in board.board]
+
+def _row_patterns(grid, order):
+    # Each row's blank/given pattern under a column order, as a 9-bit number
+    # whose top bit is the first column (1 = given)
+    return [sum(1 << (8 - k) for k, col in enumerate(order) if row[col]) for row in grid]
+
+def _row_orders(patterns):
+    # Row orders giving the smallest pattern sequence: rows sorted inside each
+    # band, bands sorted by their sorted patterns, every tie enumerated
+    bands = []
+    for band in range(3):
+        rows = sorted(range(band * 3, band * 3 + 3), key=lambda r: patterns[r])
+        bands.append(rows)
+    bands.sort(key=lambda rows: [patterns[r] for r in rows])
+    key = [[patterns[r] for r in rows] for rows in bands]
+
+    def tied_orders(items, item_key):
+        # Every order of `items` that keeps item_key sorted
+        groups = [list(group) for _, group in itertools.groupby(items, key=item_key)]
+        for choice in itertools.product(*(itertools.permutations(group) for group in groups)):
+            yield [item for group in choice for item in group]
+
+    best = [p for band in key for p in band]
+    orders = []
+    for band_order in tied_orders(bands, lambda rows: [patterns[r] for r in rows]):
+        for inner in itertools.product(*(tied_orders(rows, lambda r: patterns[r]) for rows in band_order)):
+            orders.append([r for rows in inner for r in rows])
+    return best, orders
+
+def _relabelled(grid, rows, cols):
+    # The transformed grid as a string, digits renamed in order of first appearance
+    labels = {0: "0"}
+    out = []
+    for r in rows:
+        row = grid[r]
+        for c in cols:
+            value = row[c]
+            if value not in labels:
+                labels[value] = str(len(labels))
+            out.append(labels[value])
+    return "".join(out)
+
+def canonical_form(board):
+    # One 81-character string for everything the board can be turned into
+    # by transposing, reordering bands/stacks and the lines inside them, and
+    # relabelling digits. Equivalent puzzles get the same string.
+    #
+    # The smallest blank/given pattern is found first over the geometric
+    # moves alone, which is cheap; digits are only compared between the few
+    # transforms that tie on it. The result isn't always the smallest string
+    # of all, but both steps give the same answer for every equivalent board,
+    # which is all a canonical form needs. A full grid has no pattern to
+    # narrow the transforms down with, so every one of them would tie, and
+    # nearly empty ones have hardly more: an empty board takes about 40 s.
+    # Those aren't puzzles anyway, since a puzzle with one solution needs at
+    # least 17 givens.
+    grid = _grid(board)
+    givens = sum(1 for row in grid for value in row if value)
+    if givens == 81:
+        raise ValueError("Canonical forms are only defined for puzzles with blank cells")
+    if givens < 17:
+        raise ValueError(f"Canonical forms need at least 17 givens, the fewest a puzzle can have; got {givens}")
+    transposed = [list(col) for col in zip(*grid)]
+    best_pattern = None
+    candidates = []
+    for g in (grid, transposed):
+        for order in COLUMN_ORDERS:
+            pattern, row_orders = _row_orders(_row_patterns(g, order))
+            if best_pattern is None or pattern < best_pattern:
+                best_pattern = pattern
+                candidates = []
+            if pattern == best_pattern:
+                candidates.extend((g, rows, order) for rows in row_orders)
+    return min(_relabelled(g, rows, order) for g, rows, order in candidates)
+
+class PuzzleIndex:
+    # Set of canonical forms persisted to a text file (one per line), so a
+    # puzzle bank can reject any puzzle equivalent to one it already holds
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.forms = set()
+        if os.path.exists(path):
+            with open(path) as f:
+                self.forms.update(line.strip() for line in f if line.strip())
+
+    def __len__(self):
+        return len(self.forms)
+
+    def __contains__(self, board):
+        return canonical_form(board) in self.forms
+
+    def add(self, board):
+        # Records the puzzle; False if an equivalent puzzle is already indexed
+        form = canonical_form(board)
+        with self.lock:
+            if form in self.forms:
+                return False
+            self.forms.add(form)
+            with open(self.path, "a") as f:
+                f.write(form + "\n")
+        return True
@@ -0,0 +1,430 @@
+import random
+from collections import deque
+from itertools import combinations
+
+# Cells are numbered row-major (row * size + col) and every domain is a
+# bitmask of the digits still possible there, bit d for digit d, the same
+# layout SudokuBoard.candidates uses
+
+def popcount(mask):
+    return bin(mask).count("1")
+
+class AllDifferent:
+    # No digit twice among the cells. A unit with as many cells as there are
+    # digits (row, column, box, region, diagonal) must also hold every digit,
+    # so a digit with one place left goes there (hidden single).
+    def __init__(self, cells, all_digits):
+        self.cells = tuple(cells)
+        self.all_digits = all_digits
+        self.complete = popcount(all_digits) == len(self.cells)
+
+    def propagate(self, domains):
+        # Narrows the domains in place; the cells it changed, or None if the
+        # constraint can no longer be met
+        cells = self.cells
+        fixed = 0
+        for cell in cells:
+            d = domains[cell]
+            if not d & (d - 1):
+                if not d or fixed & d:
+                    return None
+                fixed |= d
+        changed = []
+        if fixed:
+            for cell in cells:
+                d = domains[cell]
+                if d & (d - 1) and d & fixed:
+                    d &= ~fixed
+                    if not d:
+                        return None
+                    domains[cell] = d
+                    changed.append(cell)
+        if self.complete:
+            once = twice = 0
+            for cell in cells:
+                d = domains[cell]
+                twice |= once & d
+                once |= d
+            if once != self.all_digits:
+                return None
+            hidden = once & ~twice & ~fixed
+            if hidden:
+                for cell in cells:
+                    d = domains[cell] & hidden
+                    if d and domains[cell] != d:
+                        if d & (d - 1):
+                            return None  # two digits that both only fit here
+                        domains[cell] = d
+                        changed.append(cell)
+        return changed
+
+# Digit sets (as masks) of `count` distinct digits from 1..size adding up
+# to `total`, keyed by (size, count, total)
+_CAGE_COMBOS = {}
+
+def cage_combos(size, count, total):
+    key = (size, count, total)
+    if key not in _CAGE_COMBOS:
+        _CAGE_COMBOS[key] = [
+            sum(1 << d for d in digits)
+            for digits in combinations(range(1, size + 1), count)
+            if sum(digits) == total
+        ]
+    return _CAGE_COMBOS[key]
+
+class CageSum(AllDifferent):
+    # Killer cage: distinct digits adding up to `total`. Only digit sets that
+    # still fit the cage's domains are kept, and each cell is limited to the
+    # digits those sets share.
+    def __init__(self, cells, total, all_digits):
+        super().__init__(cells, all_digits)
+        self.total = total
+        self.combos = cage_combos(popcount(all_digits), len(self.cells), total)
+
+    def propagate(self, domains):
+        changed = super().propagate(domains)
+        if changed is None:
+            return None
+        fixed = union = 0
+        for cell in self.cells:
+            d = domains[cell]
+            union |= d
+            if not d & (d - 1):
+                fixed |= d
+        allowed = 0
+        for combo in self.combos:
+            if combo & fixed == fixed and not combo & ~union:
+                allowed |= combo
+        if not allowed:
+            return None
+        for cell in self.cells:
+            d = domains[cell]
+            if d & ~allowed:
+                d &= allowed
+                if not d:
+                    return None
+                domains[cell] = d
+                changed.append(cell)
+        return changed
+
+def box_regions(box_size):
+    # The classic boxes as lists of cells
+    n = box_size * box_size
+    return [[(box // box_size * box_size + k // box_size) * n + box % box_size * box_size + k % box_size
+             for k in range(n)] for box in range(n)]
+
+class SudokuVariant:
+    # The rules of a sudoku as a list of constraints: rows and columns, then
+    # the regions (the classic boxes unless jigsaw regions are given), both
+    # main diagonals if `diagonals`, and one CageSum per (cells, total) cage.
+    # Immutable once built, so boards and threads can share one.
+    def __init__(self, box_size=3, regions=None, diagonals=False, cages=()):
+        self.box_size = box_size
+        self.size = n = box_size * box_size
+        self.all_digits = (1 << (n + 1)) - 2
+        self.regions = [list(region) for region in regions] if regions else box_regions(box_size)
+        self.diagonals = diagonals
+        self.cages = [(tuple(cells), total) for cells, total in cages]
+        units = [[r * n + c for c in range(n)] for r in range(n)]
+        units += [[r * n + c for r in range(n)] for c in range(n)]
+        units += self.regions
+        if diagonals:
+            units.append([k * n + k for k in range(n)])
+            units.append([k * n + n - 1 - k for k in range(n)])
+        self.constraints = [AllDifferent(unit, self.all_digits) for unit in units]
+        self.constraints += [CageSum(cells, total, self.all_digits) for cells, total in self.cages]
+        # Constraints to revisit when a cell's domain shrinks
+        self.watchers = [[] for _ in range(n * n)]
+        for index, constraint in enumerate(self.constraints):
+            for cell in constraint.cells:
+                self.watchers[cell].append(index)
+
+    def with_cages(self, cages):
+        return SudokuVariant(self.box_size, self.regions, self.diagonals, cages)
+
+    def domains(self, grid):
+        # Starting domains for a grid of values (0 = empty)
+        n = self.size
+        return [1 << grid[cell // n][cell % n] if grid[cell // n][cell % n] else self.all_digits
+                for cell in range(n * n)]
+
+    def grid_of(self, domains):
+        # Domains back to rows of values, 0 where a cell is still undecided
+        n = self.size
+        return [[d.bit_length() - 1 if d and not d & (d - 1) else 0 for d in domains[r * n:r * n + n]]
+                for r in range(n)]
+
+    def candidates(self, grid, row, col):
+        # Digits that can go in (row, col) given every other filled cell,
+        # before any propagation
+        n = self.size
+        cell = row * n + col
+        mask = self.all_digits
+        for index in self.watchers[cell]:
+            constraint = self.constraints[index]
+            for other in constraint.cells:
+                value = grid[other // n][other % n]
+                if other != cell and value:
+                    mask &= ~(1 << value)
+        return mask
+
+    def propagate(self, domains, queue):
+        # Runs the constraints in `queue`, and every constraint on a cell they
+        # narrow, until nothing changes. False on a contradiction.
+        constraints, watchers = self.constraints, self.watchers
+        pending = deque(queue)
+        queued = set(pending)
+        while pending:
+            index = pending.popleft()
+            queued.discard(index)
+            changed = constraints[index].propagate(domains)
+            if changed is None:
+                return False
+            for cell in changed:
+                for watcher in watchers[cell]:
+                    if watcher not in queued:
+                        queued.add(watcher)
+                        pending.append(watcher)
+        return True
+
+    def branch_cell(self, domains):
+        # Undecided cell with the smallest domain (MRV), or None if all are decided
+        best = None
+        best_count = self.size + 1
+        for cell, d in enumerate(domains):
+            if d & (d - 1):
+                count = popcount(d)
+                if count < best_count:
+                    best, best_count = cell, count
+                    if count == 2:
+                        break
+        return best
+
+class ConstraintSearch:
+    # One search over a variant's constraints, branching on the MRV cell and
+    # propagating after every choice. Keeps its own counters, so searches on
+    # a shared variant don't interfere.
+    def __init__(self, variant, max_nodes=None):
+        self.variant = variant
+        self.nodes = 0
+        self.max_nodes = max_nodes  # node budget for one search; None is unlimited
+        self.aborted = False
+
+    def solve(self, grid, randomize=False):
+        # A solved copy of `grid` as a list of rows, or None if there is no
+        # solution (or the node budget ran out: check self.aborted)
+        variant = self.variant
+        domains = self.search(variant.domains(grid), range(len(variant.constraints)), randomize)
+        if domains is None:
+            return None
+        return variant.grid_of(domains)
+
+    def search(self, domains, queue, randomize):
+        self.nodes += 1
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            self.aborted = True
+            return None
+        variant = self.variant
+        if not variant.propagate(domains, queue):
+            return None
+        cell = variant.branch_cell(domains)
+        if cell is None:
+            return domains
+        mask = domains[cell]
+        digits = []
+        while mask:
+            low = mask & -mask
+            digits.append(low)
+            mask ^= low
+        if randomize:
+            random.shuffle(digits)
+        for bit in digits:
+            child = domains[:]
+            child[cell] = bit
+            result = self.search(child, variant.watchers[cell], randomize)
+            if result is not None or self.aborted:
+                return result
+        return None
+
+    def count(self, grid, limit=2):
+        # Number of solutions of `grid`, stopping at `limit`
+        variant = self.variant
+        return self.count_domains(variant.domains(grid), range(len(variant.constraints)), limit)
+
+    def count_domains(self, domains, queue, limit):
+        self.nodes += 1
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            self.aborted = True
+            return 0
+        variant = self.variant
+        if not variant.propagate(domains, queue):
+            return 0
+        cell = variant.branch_cell(domains)
+        if cell is None:
+            return 1
+        mask = domains[cell]
+        found = 0
+        while mask and found < limit and not self.aborted:
+            low = mask & -mask
+            mask ^= low
+            child = domains[:]
+            child[cell] = low
+            found += self.count_domains(child, variant.watchers[cell], limit - found)
+        return found
+
+class SteppedSearch:
+    # ConstraintSearch.solve unrolled onto an explicit stack, so it can be
+    # advanced a few nodes at a time (say once per frame) and dropped at
+    # any point to cancel it
+    def __init__(self, variant, grid, randomize=True):
+        self.variant = variant
+        self.randomize = randomize
+        self.stack = []  # [domains, branch cell, digit bits still to try] per level
+        self.nodes = 0
+        self.domains = None  # the latest consistent domains, to show progress
+        self.solution = None
+        self.done = False
+        self.enter(variant.domains(grid), range(len(variant.constraints)))
+
+    def enter(self, domains, queue):
+        self.nodes += 1
+        variant = self.variant
+        if not variant.propagate(domains, queue):
+            return
+        self.domains = domains
+        cell = variant.branch_cell(domains)
+        if cell is None:
+            self.solution = variant.grid_of(domains)
+            self.done = True
+            return
+        mask = domains[cell]
+        digits = []
+        while mask:
+            low = mask & -mask
+            digits.append(low)
+            mask ^= low
+        if self.randomize:
+            random.shuffle(digits)
+        self.stack.append((domains, cell, digits))
+
+    def step(self, max_nodes):
+        # Visits up to max_nodes more nodes; True once the search is over,
+        # with the solved grid in self.solution (None if there is none)
+        while not self.done and max_nodes > 0:
+            if not self.stack:
+                self.done = True
+                break
+            domains, cell, digits = self.stack[-1]
+            if not digits:
+                self.stack.pop()
+                continue
+            child = domains[:]
+            child[cell] = digits.pop()
+            self.enter(child, self.variant.watchers[cell])
+            max_nodes -= 1
+        return self.done
+
+    def progress(self):
+        # Values decided so far on the current branch, 0 elsewhere
+        if self.domains is None:
+            return None
+        return self.variant.grid_of(self.domains)
+
+def random_regions(box_size=3, swaps=None):
+    # Jigsaw regions: the classic boxes reshaped by swapping the owners of
+    # two neighbouring cells from different regions, whenever both regions
+    # stay connected
+    n = box_size * box_size
+    swaps = 4 * n if swaps is None else swaps
+    owner = [0] * (n * n)
+    for index, region in enumerate(box_regions(box_size)):
+        for cell in region:
+            owner[cell] = index
+
+    def neighbours(cell):
+        r, c = divmod(cell, n)
+        if r > 0:
+            yield cell - n
+        if r < n - 1:
+            yield cell + n
+        if c > 0:
+            yield cell - 1
+        if c < n - 1:
+            yield cell + 1
+
+    def connected(region):
+        cells = [cell for cell in range(n * n) if owner[cell] == region]
+        seen = {cells[0]}
+        stack = [cells[0]]
+        while stack:
+            for other in neighbours(stack.pop()):
+                if other not in seen and owner[other] == region:
+                    seen.add(other)
+                    stack.append(other)
+        return len(seen) == len(cells)
+
+    done = 0
+    for _ in range(swaps * 50):
+        if done >= swaps:
+            break
+        a = random.randrange(n * n)
+        b = random.choice(list(neighbours(a)))
+        if owner[a] == owner[b]:
+            continue
+        # a joins b's region and some other cell c of b's region, touching
+        # a's region, moves the other way
+        region_a, region_b = owner[a], owner[b]
+        choices = [c for c in range(n * n) if owner[c] == region_b and c != b
+                   and any(owner[o] == region_a and o != a for o in neighbours(c))]
+        if not choices:
+            continue
+        c = random.choice(choices)
+        owner[a], owner[c] = region_b, region_a
+        if connected(region_a) and connected(region_b):
+            done += 1
+        else:
+            owner[a], owner[c] = region_a, region_b
+    regions = [[] for _ in range(n)]
+    for cell, region in enumerate(owner):
+        regions[region].append(cell)
+    return regions
+
+def random_cages(grid, max_size=4):
+    # Killer cages covering a solved grid: connected groups of 1..max_size
+    # cells with no repeated digit, each with the total of its digits
+    n = len(grid)
+    value = [grid[cell // n][cell % n] for cell in range(n * n)]
+    caged = [False] * (n * n)
+    cells = list(range(n * n))
+    random.shuffle(cells)
+    cages = []
+    for start in cells:
+        if caged[start]:
+            continue
+        target = random.randint(2, max_size)
+        cage = [start]
+        caged[start] = True
+        digits = {value[start]}
+        while len(cage) < target:
+            options = []
+            for cell in cage:
+                r, c = divmod(cell, n)
+                for other, ok in ((cell - n, r > 0), (cell + n, r < n - 1), (cell - 1, c > 0), (cell + 1, c < n - 1)):
+                    if ok and not caged[other] and value[other] not in digits:
+                        options.append(other)
+            if not options:
+                break
+            other = random.choice(options)
+            cage.append(other)
+            caged[other] = True
+            digits.add(value[other])
+        cages.append((tuple(sorted(cage)), sum(value[cell] for cell in cage)))
+    return cages
+
+# One shared classic variant per box size, built on first use
+_CLASSIC = {}
+
+def classic_variant(box_size=3):
+    if box_size not in _CLASSIC:
+        _CLASSIC[box_size] = SudokuVariant(box_size)
+    return _CLASSIC[box_size]
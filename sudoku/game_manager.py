@@ -9,42 +9,100 @@ class Difficulty(Enum):
     EXPERT = 4
 
 class GameManager:
-    def __init__(self, solver):
+    def __init__(self, solver, pool=None, box_size=3):
         self.solver = solver
+        self.pool = pool
+        self.box_size = box_size  # 3 for the classic 9x9 game, 4 for 16x16, 5 for 25x25
         self.board = None
         self.difficulty = Difficulty.EASY
         self.start_time = None
         self.elapsed_time = 0
         self.score = 0
         self.move_history = []
+        # (SteppedSearch, 'hint' or 'solve') while a Hint or Solve waits for
+        # a solution; advance() moves it on a little every frame
+        self.pending = None
     
     def new_game(self):
+        self.pending = None
         try:
-            self.board = self.solver.generate_puzzle(self.difficulty)
+            self.board = None
+            if self.pool and self.pool.box_size == self.box_size:
+                self.board = self.pool.take(self.difficulty)
+            if self.board is None:
+                self.board = self.solver.generate_puzzle(self.difficulty, box_size=self.box_size)
+                # The generator falls back to the closest puzzle it made, which
+                # is then played and scored at its own rating
+                if self.board.rating not in (None, self.difficulty):
+                    print(f"No {self.difficulty.name} puzzle came up; this one is {self.board.rating.name}.")
             self.start_time = time.time()
             self.elapsed_time = 0
             self.score = 0
             self.move_history.clear()
         except Exception as e:
             print(f"Error generating new game: {e}")
-            self.board = SudokuBoard()  # Create an empty board as fallback
+            self.board = SudokuBoard(self.box_size)  # Create an empty board as fallback
     
     def undo(self):
+        self.pending = None
         if self.move_history:
             row, col, prev_value = self.move_history.pop()
             self.board.set_cell(row, col, prev_value)
     
     def hint(self):
-        hint = self.solver.get_hint(self.board)
-        if hint:
-            row, col, value = hint
-            self.board.set_cell(row, col, value)
+        self.request_solution('hint')
     
     def check(self):
-        return self.board.is_valid()
+        # Repeated digits are tracked live on the board, so they fail Check
+        # without a scan; otherwise compare against the solution
+        if self.board.conflicts:
+            return False
+        return self.solver.check(self.board)
     
     def solve(self):
-        self.solver.solve_puzzle(self.board)
+        self.request_solution('solve')
+
+    def request_solution(self, action):
+        # Acts at once from the cached solution (wrong entries get corrected
+        # from it first), and otherwise starts a search for advance() to run.
+        # Clicking Hint or Solve again while one is running cancels it.
+        if self.pending:
+            self.pending = None
+            return
+        if self.board.solution is not None:
+            self.apply_solution(action)
+            return
+        self.pending = (self.solver.solve_steps(self.board), action)
+
+    def advance(self, max_nodes=20):
+        # Called once per frame: runs the pending search for at most max_nodes
+        # nodes and acts on its answer once it has one
+        if not self.pending:
+            return
+        search, action = self.pending
+        if not search.step(max_nodes):
+            return
+        self.pending = None
+        if search.solution is None:
+            print("This board has no solution.")
+            return
+        self.board.solution = search.solution
+        self.apply_solution(action)
+
+    def apply_solution(self, action):
+        if action == 'hint':
+            hint = self.solver.hint_from(self.board, self.board.solution)
+            if hint:
+                row, col, value = hint
+                self.board.set_cell(row, col, value)
+        else:
+            self.solver.fill_from(self.board, self.board.solution)
+
+    def progress(self):
+        # Cells the pending search has decided so far, for drawing, or None
+        if not self.pending:
+            return None
+        return self.pending[0].progress()
     
     def update_time(self):
         if self.start_time:
@@ -52,6 +110,7 @@ class GameManager:
     
     def make_move(self, row, col, value):
         if self.board.get_cell(row, col) == 0:
+            self.pending = None  # its answer would be for the old board
             prev_value = self.board.get_cell(row, col)
             self.board.set_cell(row, col, value)
             self.move_history.append((row, col, prev_value))
@@ -65,6 +124,6 @@ class GameManager:
             Difficulty.MEDIUM: 2000,
             Difficulty.HARD: 3000,
             Difficulty.EXPERT: 4000
-        }[self.difficulty]
+        }[self.board.rating or self.difficulty]
         time_penalty = self.elapsed_time // 60  # Penalty for each minute
         self.score = max(0, base_score - time_penalty)
\ No newline at end of file
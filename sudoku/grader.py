@@ -0,0 +1,203 @@
+from enum import IntEnum
+from game_manager import Difficulty
+
+class Technique(IntEnum):
+    NAKED_SINGLE = 1
+    HIDDEN_SINGLE = 2
+    NAKED_PAIR = 3
+    HIDDEN_PAIR = 4
+    POINTING = 5
+    X_WING = 6
+    GUESSING = 7  # none of the above make progress; needs trial and error
+
+# Hardest technique a puzzle may need to land in each difficulty bucket
+DIFFICULTY_TECHNIQUES = {
+    Difficulty.EASY: Technique.HIDDEN_SINGLE,
+    Difficulty.MEDIUM: Technique.HIDDEN_PAIR,
+    Difficulty.HARD: Technique.POINTING,
+    Difficulty.EXPERT: Technique.GUESSING,
+}
+
+ALL_DIGITS = 0b1111111110
+BITS = [1 << d for d in range(10)]
+DIGIT_OF = {1 << d: d for d in range(1, 10)}
+
+ROWS = [[r * 9 + c for c in range(9)] for r in range(9)]
+COLS = [[r * 9 + c for r in range(9)] for c in range(9)]
+BOXES = [[(b // 3 * 3 + i // 3) * 9 + b % 3 * 3 + i % 3 for i in range(9)] for b in range(9)]
+UNITS = ROWS + COLS + BOXES
+PEERS = [sorted({p for unit in UNITS if cell in unit for p in unit} - {cell}) for cell in range(81)]
+ROW_OF = [cell // 9 for cell in range(81)]
+COL_OF = [cell % 9 for cell in range(81)]
+
+def difficulty_for(technique):
+    for difficulty in Difficulty:
+        if technique <= DIFFICULTY_TECHNIQUES[difficulty]:
+            return difficulty
+    return Difficulty.EXPERT
+
+class PuzzleGrader:
+    # Solves a puzzle the way a person would, always using the easiest
+    # technique that makes progress, and rates it by the hardest one needed.
+    def grade(self, board):
+        self.values = [board.get_cell(i // 9, i % 9) for i in range(81)]
+        self.cands = [0] * 81
+        for cell in range(81):
+            if not self.values[cell]:
+                used = 0
+                for peer in PEERS[cell]:
+                    used |= BITS[self.values[peer]]
+                self.cands[cell] = ALL_DIGITS & ~used
+        self.broken = False
+        hardest = Technique.NAKED_SINGLE
+        steps = (
+            (Technique.NAKED_SINGLE, self.naked_singles),
+            (Technique.HIDDEN_SINGLE, self.hidden_singles),
+            (Technique.NAKED_PAIR, self.naked_pairs),
+            (Technique.HIDDEN_PAIR, self.hidden_pairs),
+            (Technique.POINTING, self.pointing),
+            (Technique.X_WING, self.x_wing),
+        )
+        while 0 in self.values:
+            for technique, step in steps:
+                if step():
+                    hardest = max(hardest, technique)
+                    break
+            else:
+                return Technique.GUESSING
+            if self.broken:
+                return Technique.GUESSING
+        return hardest
+
+    def rate(self, board):
+        return difficulty_for(self.grade(board))
+
+    def place(self, cell, digit):
+        bit = BITS[digit]
+        if not self.cands[cell] & bit:
+            self.broken = True  # contradiction: the puzzle has no solution
+            return
+        self.values[cell] = digit
+        self.cands[cell] = 0
+        cands = self.cands
+        for peer in PEERS[cell]:
+            if cands[peer] & bit:
+                cands[peer] &= ~bit
+                if not cands[peer] and not self.values[peer]:
+                    self.broken = True
+
+    def eliminate(self, cells, mask):
+        progress = False
+        cands = self.cands
+        for cell in cells:
+            if cands[cell] & mask:
+                cands[cell] &= ~mask
+                progress = True
+        return progress
+
+    def naked_singles(self):
+        progress = False
+        for cell in range(81):
+            mask = self.cands[cell]
+            if mask and not mask & (mask - 1):
+                self.place(cell, DIGIT_OF[mask])
+                progress = True
+        return progress
+
+    def hidden_singles(self):
+        cands = self.cands
+        progress = False
+        for unit in UNITS:
+            once = twice = 0
+            for cell in unit:
+                mask = cands[cell]
+                twice |= once & mask
+                once |= mask
+            once &= ~twice
+            if once:
+                for cell in unit:
+                    mask = cands[cell] & once
+                    if mask:
+                        self.place(cell, DIGIT_OF[mask & -mask])
+                        progress = True
+        return progress
+
+    def naked_pairs(self):
+        cands = self.cands
+        for unit in UNITS:
+            seen = {}
+            for cell in unit:
+                mask = cands[cell]
+                if mask and bin(mask).count("1") == 2:
+                    if mask in seen:
+                        pair = (seen[mask], cell)
+                        others = [c for c in unit if c not in pair]
+                        if self.eliminate(others, mask):
+                            return True
+                    else:
+                        seen[mask] = cell
+        return False
+
+    def hidden_pairs(self):
+        cands = self.cands
+        for unit in UNITS:
+            # Cells of the unit holding each digit, as a bitmask over unit positions
+            where = [0] * 10
+            for position, cell in enumerate(unit):
+                mask = cands[cell]
+                for d in range(1, 10):
+                    if mask & BITS[d]:
+                        where[d] |= 1 << position
+            seen = {}
+            for d in range(1, 10):
+                spots = where[d]
+                if bin(spots).count("1") == 2:
+                    if spots in seen:
+                        pair_mask = BITS[d] | BITS[seen[spots]]
+                        cells = [unit[p] for p in range(9) if spots & (1 << p)]
+                        if self.eliminate(cells, ALL_DIGITS & ~pair_mask):
+                            return True
+                    else:
+                        seen[spots] = d
+        return False
+
+    def pointing(self):
+        # A digit confined to one row or column inside a box can be removed
+        # from the rest of that row or column
+        cands = self.cands
+        for box in BOXES:
+            for d in range(1, 10):
+                bit = BITS[d]
+                cells = [cell for cell in box if cands[cell] & bit]
+                if len(cells) < 2:
+                    continue
+                rows = {ROW_OF[cell] for cell in cells}
+                if len(rows) == 1:
+                    line = [c for c in ROWS[rows.pop()] if c not in box]
+                    if self.eliminate(line, bit):
+                        return True
+                cols = {COL_OF[cell] for cell in cells}
+                if len(cols) == 1:
+                    line = [c for c in COLS[cols.pop()] if c not in box]
+                    if self.eliminate(line, bit):
+                        return True
+        return False
+
+    def x_wing(self):
+        cands = self.cands
+        for lines, crosses, index_of in ((ROWS, COLS, COL_OF), (COLS, ROWS, ROW_OF)):
+            for d in range(1, 10):
+                bit = BITS[d]
+                seen = {}
+                for number, line in enumerate(lines):
+                    spots = tuple(index_of[cell] for cell in line if cands[cell] & bit)
+                    if len(spots) != 2:
+                        continue
+                    if spots in seen:
+                        corners = set(lines[seen[spots]]) | set(line)
+                        others = [c for i in spots for c in crosses[i] if c not in corners]
+                        if self.eliminate(others, bit):
+                            return True
+                    else:
+                        seen[spots] = number
+        return False
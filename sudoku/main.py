@@ -1,33 +1,84 @@
-import pygame
+import argparse
 import sys
-from game_manager import GameManager
 from sudoku_solver import SudokuSolver
-from ui_manager import UIManager
-
-pygame.init()
-
-# Set up display
-WIDTH, HEIGHT = 600, 700
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Sudoku")
-
-# Initialize game components
-solver = SudokuSolver()
-game_manager = GameManager(solver)
-ui_manager = UIManager(screen, game_manager)
-
-# Start a new game
-game_manager.new_game()
-
-# Main game loop
-clock = pygame.time.Clock()
-while True:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            pygame.quit()
-            sys.exit()
-        ui_manager.handle_event(event)
-    
-    ui_manager.draw()
-    pygame.display.flip()
-    clock.tick(60)
\ No newline at end of file
+
+# 3 for the classic 9x9 game, 4 for 16x16, 5 for 25x25
+BOX_SIZE = 3
+
+def run_gui():
+    import pygame
+    from game_manager import GameManager
+    from puzzle_pool import PuzzlePool
+    from ui_manager import UIManager
+
+    pygame.init()
+
+    # Set up display
+    board_pixels = BOX_SIZE ** 2 * UIManager.cell_size_for(BOX_SIZE ** 2)
+    width, height = max(600, board_pixels), board_pixels + 250
+    screen = pygame.display.set_mode((width, height))
+    pygame.display.set_caption("Sudoku")
+
+    # Initialize game components. Hint and Solve search a little every frame
+    # (SteppedSearch); the solver's own solves (Check without a cached
+    # solution, generating when the pool is dry) race several strategies so
+    # a pathological board can't stall them for long
+    solver = SudokuSolver(portfolio=True)
+    puzzle_pool = PuzzlePool(solver.backend, box_size=BOX_SIZE)
+    puzzle_pool.start()
+    game_manager = GameManager(solver, puzzle_pool, BOX_SIZE)
+    ui_manager = UIManager(screen, game_manager)
+
+    # Start a new game
+    game_manager.new_game()
+
+    # Main game loop
+    clock = pygame.time.Clock()
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                puzzle_pool.stop()
+                pygame.quit()
+                sys.exit()
+            ui_manager.handle_event(event)
+
+        game_manager.advance()
+        ui_manager.draw()
+        pygame.display.flip()
+        clock.tick(60)
+
+def run_batch_cli(args):
+    # Imported here so batch runs never touch pygame or open a window
+    from batch_solver import run_batch
+
+    report = run_batch(args.batch, args.output, args.workers, args.backend, args.check_unique,
+                       verify=args.verify)
+    print(f"Solved {report['puzzles'] - report['failures']}/{report['puzzles']} puzzles "
+          f"in {report['seconds']:.2f}s ({report['puzzles_per_sec']:.1f} puzzles/sec)", file=sys.stderr)
+    print(f"Solve time p50 {report['p50_ms']:.2f} ms, p99 {report['p99_ms']:.2f} ms, "
+          f"failures {report['failures']}", file=sys.stderr)
+    if args.check_unique:
+        print(f"Puzzles without a unique solution: {report['not_unique']}", file=sys.stderr)
+    if args.verify:
+        print(f"Solutions that failed verification: {report['invalid']}", file=sys.stderr)
+    return 1 if report["failures"] or report.get("invalid") else 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Sudoku game, or a headless batch solver with --batch")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="solve the puzzles in FILE (one 81-character puzzle per line, '-' for stdin) without the UI")
+    parser.add_argument("--output", metavar="FILE", default="-",
+                        help="where to write the solutions, in input order (default: stdout)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--backend", default="dlx", choices=SudokuSolver.BACKENDS, help="solver backend")
+    parser.add_argument("--check-unique", action="store_true", help="also count puzzles with more than one solution")
+    parser.add_argument("--verify", action="store_true",
+                        help="check every solution with the batched validator in array_board.py (needs numpy)")
+    args = parser.parse_args()
+
+    if args.batch:
+        sys.exit(run_batch_cli(args))
+    run_gui()
+
+if __name__ == "__main__":
+    main()
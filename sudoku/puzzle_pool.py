@@ -0,0 +1,160 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from canonical import PuzzleIndex
+from game_manager import Difficulty
+from sudoku_board import SudokuBoard
+from sudoku_solver import SudokuSolver
+
+POOL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "puzzle_pool.json")
+INDEX_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "puzzle_index.txt")
+
+def pool_file(box_size):
+    # POOL_FILE for 9x9 boards; other sizes get one file each
+    if box_size == 3:
+        return POOL_FILE
+    n = box_size * box_size
+    return os.path.join(os.path.dirname(POOL_FILE), f"puzzle_pool_{n}x{n}.json")
+
+class PuzzlePool:
+    # Keeps a few ready-made puzzles per Difficulty so New Game never has to
+    # wait for the generator. Worker threads top the pool up in the background
+    # and the pool is saved to disk so it is already full on the next start.
+    def __init__(self, backend="dlx", target_depth=5, workers=1, path=None,
+                 index_path=INDEX_FILE, box_size=3):
+        self.backend = backend
+        self.target_depth = target_depth
+        self.workers = workers
+        self.box_size = box_size  # every puzzle in the pool is this size
+        self.path = pool_file(box_size) if path is None else path
+        # Canonical forms of every puzzle ever pooled, so equivalent puzzles
+        # (relabelled, reflected, lines shuffled) are never served twice.
+        # canonical_form only handles 9x9, so other sizes aren't indexed.
+        self.index = PuzzleIndex(index_path) if box_size == 3 else None
+        self.duplicates = 0
+        self.puzzles = {difficulty: deque() for difficulty in Difficulty}
+        self.generated = {difficulty: 0 for difficulty in Difficulty}
+        self.generation_time = {difficulty: 0.0 for difficulty in Difficulty}
+        self.in_progress = {difficulty: 0 for difficulty in Difficulty}
+        self.condition = threading.Condition()
+        self.save_lock = threading.Lock()
+        self.threads = []
+        self.running = False
+        self.load()
+
+    def start(self):
+        self.running = True
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self.refill_loop, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        for thread in self.threads:
+            thread.join()
+        self.threads.clear()
+        self.save()
+
+    def take(self, difficulty):
+        # A ready puzzle for the difficulty, or None if the pool has run dry
+        with self.condition:
+            if not self.puzzles[difficulty]:
+                return None
+            board = SudokuBoard.from_string(*self.puzzles[difficulty].popleft())
+            board.rating = difficulty
+            self.condition.notify_all()
+        self.save()
+        return board
+
+    def next_difficulty(self):
+        # The emptiest difficulty that is below target, or None if all are full
+        def depth(d):
+            return len(self.puzzles[d]) + self.in_progress[d]
+        shortest = min(Difficulty, key=depth)
+        if depth(shortest) >= self.target_depth:
+            return None
+        return shortest
+
+    def refill_loop(self):
+        solver = SudokuSolver(self.backend)
+        while True:
+            with self.condition:
+                difficulty = self.next_difficulty()
+                while self.running and difficulty is None:
+                    self.condition.wait()
+                    difficulty = self.next_difficulty()
+                if not self.running:
+                    return
+                self.in_progress[difficulty] += 1
+            start = time.perf_counter()
+            board = solver.generate_puzzle(difficulty, box_size=self.box_size)
+            elapsed = time.perf_counter() - start
+            # A puzzle is filed under the difficulty it was rated, which is
+            # easier than asked for when no attempt reached the bucket; the
+            # bucket asked for stays the emptiest, so it is tried again next.
+            # Puzzles for a bucket that is already full are dropped. The rate
+            # counts on the difficulty asked for, time and hits alike, before
+            # any of that is decided.
+            with self.condition:
+                self.in_progress[difficulty] -= 1
+                self.generation_time[difficulty] += elapsed
+                if board.rating == difficulty:
+                    self.generated[difficulty] += 1
+                surplus = len(self.puzzles[board.rating]) >= self.target_depth
+                if surplus:
+                    self.condition.notify_all()
+                    continue
+            unique = self.index is None or self.index.add(board)
+            with self.condition:
+                if not unique:
+                    self.duplicates += 1
+                    self.condition.notify_all()
+                    continue
+                if len(self.puzzles[board.rating]) >= self.target_depth:
+                    # Another worker filled the bucket while this one indexed
+                    self.condition.notify_all()
+                    continue
+                self.puzzles[board.rating].append((board.to_string(), board.solution_string()))
+            self.save()
+
+    def depth(self):
+        with self.condition:
+            return {difficulty: len(puzzles) for difficulty, puzzles in self.puzzles.items()}
+
+    def refill_rate(self):
+        # Puzzles rated as asked per second of worker time spent asking for
+        # each difficulty, whether or not they were filed
+        with self.condition:
+            return {
+                difficulty: self.generated[difficulty] / self.generation_time[difficulty]
+                if self.generation_time[difficulty] else 0.0
+                for difficulty in Difficulty
+            }
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        for difficulty in Difficulty:
+            for puzzle, solution in data.get(difficulty.name, []):
+                self.puzzles[difficulty].append((puzzle, solution))
+
+    def save(self):
+        # Write to a temporary file first so a crash never leaves a truncated pool
+        tmp_path = self.path + ".tmp"
+        with self.save_lock:
+            with self.condition:
+                data = {difficulty.name: list(puzzles) for difficulty, puzzles in self.puzzles.items()}
+            try:
+                with open(tmp_path, "w") as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                print(f"Error saving puzzle pool: {e}")
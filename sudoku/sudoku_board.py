@@ -1,44 +1,280 @@
+# Characters used for cell values in text form; values above 9 are letters
+DIGIT_CHARS = "0123456789ABCDEFGHIJKLMNOP"
+
+def size_for_length(length):
+    # Box size of a board whose text form has `length` characters (81 -> 3)
+    box_size = 2
+    while box_size ** 4 < length:
+        box_size += 1
+    return box_size
+
 class SudokuBoard:
-    def __init__(self):
-        self.board = [[0 for _ in range(9)] for _ in range(9)]
-    
+    # A size x size board made of box_size x box_size boxes, where
+    # size = box_size ** 2: 9x9 for the classic game, 16x16, 25x25, ...
+    def __init__(self, box_size=3):
+        self.box_size = box_size
+        self.size = n = box_size * box_size
+        self.all_digits = (1 << (n + 1)) - 2  # bits 1..n set, bit 0 unused
+        self.board = [[0 for _ in range(n)] for _ in range(n)]
+        # Bitmask of the digits already used in each row, column and box
+        self.row_mask = [0] * n
+        self.col_mask = [0] * n
+        self.box_mask = [0] * n
+        # How many times each digit appears per unit, so clearing a duplicate
+        # entered by the player doesn't drop a digit that is still present
+        self.row_count = [[0] * (n + 1) for _ in range(n)]
+        self.col_count = [[0] * (n + 1) for _ in range(n)]
+        self.box_count = [[0] * (n + 1) for _ in range(n)]
+        # Cells whose value is repeated in one of their units, kept up to date
+        # by set_cell so highlighting and Check never rescan the board
+        self.conflicts = {}
+        # Digit counts per unit of the variant, in the order of its
+        # constraints (None on a classic board); see the variant setter
+        self.unit_count = None
+        # Solved grid for this puzzle, cached when it is generated (or None)
+        self.solution = None
+        # Difficulty the generator's grading gave the puzzle (or None)
+        self.rating = None
+        self._variant = None
+
+    @property
+    def variant(self):
+        # SudokuVariant with the puzzle's extra rules (killer cages, diagonals,
+        # jigsaw regions), or None for a classic puzzle
+        return self._variant
+
+    @variant.setter
+    def variant(self, variant):
+        # A variant board tracks conflicts over the variant's own units (rows,
+        # columns, regions, diagonals and cages) instead of the classic boxes,
+        # so they are counted and the conflicts found again
+        self._variant = variant
+        n = self.size
+        self.unit_count = None
+        if variant is not None:
+            self.unit_count = [[0] * (n + 1) for _ in variant.constraints]
+            for counts, constraint in zip(self.unit_count, variant.constraints):
+                for cell in constraint.cells:
+                    counts[self.board[cell // n][cell % n]] += 1
+        self.conflicts = {}
+        for i in range(n):
+            for j in range(n):
+                value = self.board[i][j]
+                if value:
+                    for counts, _ in self.units_of(i, j):
+                        if counts[value] > 1:
+                            self.add_conflict(i, j, 1)
+
+    def box_index(self, row, col):
+        return (row // self.box_size) * self.box_size + col // self.box_size
+
     def set_cell(self, row, col, value):
+        old = self.board[row][col]
+        if old == value:
+            return
+        b = self.box_size
+        box = (row // b) * b + col // b
+        row_count, col_count, box_count = self.row_count[row], self.col_count[col], self.box_count[box]
         self.board[row][col] = value
-    
+        # Conflicts only change when a unit gains or loses a duplicate, which
+        # never happens while the solver is searching, so usually this is
+        # just the counts and masks
+        if old:
+            row_count[old] -= 1
+            col_count[old] -= 1
+            box_count[old] -= 1
+            keep = ~(1 << old)
+            if not row_count[old]:
+                self.row_mask[row] &= keep
+            if not col_count[old]:
+                self.col_mask[col] &= keep
+            if not box_count[old]:
+                self.box_mask[box] &= keep
+            if self._variant is None and (row_count[old] or col_count[old] or box_count[old]):
+                self.update_conflicts(row, col, old, -1)
+        if value:
+            row_count[value] += 1
+            col_count[value] += 1
+            box_count[value] += 1
+            bit = 1 << value
+            self.row_mask[row] |= bit
+            self.col_mask[col] |= bit
+            self.box_mask[box] |= bit
+            if self._variant is None and (row_count[value] > 1 or col_count[value] > 1 or box_count[value] > 1):
+                self.update_conflicts(row, col, value, 1)
+        if self._variant is not None:
+            self.update_unit_counts(row, col, old, value)
+
+    def update_unit_counts(self, row, col, old, value):
+        # set_cell on a variant board: the same bookkeeping over its units
+        watchers = self._variant.watchers[row * self.size + col]
+        unit_count = self.unit_count
+        for index in watchers:
+            counts = unit_count[index]
+            counts[old] -= 1
+            counts[value] += 1
+        if old and any(unit_count[index][old] for index in watchers):
+            self.update_conflicts(row, col, old, -1)
+        if value and any(unit_count[index][value] > 1 for index in watchers):
+            self.update_conflicts(row, col, value, 1)
+
+    def update_conflicts(self, row, col, value, delta):
+        # (row, col) has just gained (delta 1) or lost (delta -1) `value`,
+        # counts included. It is a duplicate in each unit still holding
+        # another copy, and the first copy it joined (or the last one it
+        # left behind) changes with it.
+        threshold = 2 if delta > 0 else 1
+        for counts, cells in self.units_of(row, col):
+            if counts[value] >= threshold:
+                self.add_conflict(row, col, delta)
+                if counts[value] == threshold:
+                    other = self.find_value(cells, value, row, col)
+                    self.add_conflict(other[0], other[1], delta)
+
+    def units_of(self, row, col):
+        # (digit counts, cells) of every unit through (row, col) that
+        # conflicts are tracked over
+        if self._variant is None:
+            box = self.box_index(row, col)
+            return ((self.row_count[row], self.row_cells(row)),
+                    (self.col_count[col], self.col_cells(col)),
+                    (self.box_count[box], self.box_cells(box)))
+        n = self.size
+        constraints = self._variant.constraints
+        return [(self.unit_count[index], [divmod(cell, n) for cell in constraints[index].cells])
+                for index in self._variant.watchers[row * n + col]]
+
+    def add_conflict(self, row, col, delta):
+        # self.conflicts maps each conflicting cell to the number of its
+        # units (row, column, box, or the variant's units) in which its
+        # value is repeated
+        count = self.conflicts.get((row, col), 0) + delta
+        if count:
+            self.conflicts[(row, col)] = count
+        else:
+            del self.conflicts[(row, col)]
+
+    def find_value(self, cells, value, row, col):
+        # The cell other than (row, col) holding `value` among `cells`
+        for i, j in cells:
+            if self.board[i][j] == value and (i, j) != (row, col):
+                return i, j
+        return None
+
+    def row_cells(self, row):
+        return [(row, j) for j in range(self.size)]
+
+    def col_cells(self, col):
+        return [(i, col) for i in range(self.size)]
+
+    def box_cells(self, box):
+        b = self.box_size
+        top, left = (box // b) * b, (box % b) * b
+        return [(top + k // b, left + k % b) for k in range(self.size)]
+
     def get_cell(self, row, col):
         return self.board[row][col]
-    
+
+    def candidates(self, row, col):
+        # Bitmask of the digits that can still go in (row, col)
+        b = self.box_size
+        used = self.row_mask[row] | self.col_mask[col] | self.box_mask[(row // b) * b + col // b]
+        return self.all_digits & ~used
+
     def is_valid(self):
-        for i in range(9):
-            if not (self.is_row_valid(i) and self.is_column_valid(i) and self.is_box_valid(i)):
-                return False
-        return True
-    
+        return not self.conflicts
+
     def is_row_valid(self, row):
-        return len(set(self.board[row]) - {0}) == len([x for x in self.board[row] if x != 0])
-    
+        return max(self.row_count[row][1:]) <= 1
+
     def is_column_valid(self, col):
-        column = [self.board[i][col] for i in range(9)]
-        return len(set(column) - {0}) == len([x for x in column if x != 0])
-    
+        return max(self.col_count[col][1:]) <= 1
+
     def is_box_valid(self, box):
-        row, col = (box // 3) * 3, (box % 3) * 3
-        box_values = [self.board[i][j] for i in range(row, row + 3) for j in range(col, col + 3)]
-        return len(set(box_values) - {0}) == len([x for x in box_values if x != 0])
-    
+        return max(self.box_count[box][1:]) <= 1
+
     def is_complete(self):
         return all(all(cell != 0 for cell in row) for row in self.board)
-    
+
+    def is_forced(self, row, col, value):
+        # True if `value` is the only digit that fits at the empty cell
+        # (row, col), or the only place left for it in the row, column or box
+        if self.candidates(row, col) == 1 << value:
+            return True
+        bit = 1 << value
+        units = (self.row_cells(row), self.col_cells(col), self.box_cells(self.box_index(row, col)))
+        for unit in units:
+            if not any(self.board[i][j] == 0 and (i, j) != (row, col) and self.candidates(i, j) & bit
+                       for i, j in unit):
+                return True
+        return False
+
     def get_empty_cell(self):
-        for i in range(9):
-            for j in range(9):
+        for i in range(self.size):
+            for j in range(self.size):
                 if self.board[i][j] == 0:
                     return i, j
         return None
-    
+
+    def get_most_constrained_cell(self):
+        # Empty cell with the fewest candidates (MRV), returned with its candidate mask
+        best = None
+        best_count = self.size + 1
+        for i in range(self.size):
+            row = self.board[i]
+            for j in range(self.size):
+                if row[j] == 0:
+                    mask = self.candidates(i, j)
+                    count = bin(mask).count("1")
+                    if count < best_count:
+                        best = (i, j, mask)
+                        best_count = count
+                        if count <= 1:
+                            return best
+        return best
+
+    def to_string(self):
+        # One character per cell in row-major order ('0' for empty cells),
+        # 81 characters for the classic board
+        return "".join(DIGIT_CHARS[cell] for row in self.board for cell in row)
+
+    @classmethod
+    def from_string(cls, text, solution=None):
+        text = text.strip()
+        board = cls(size_for_length(len(text)))
+        n = board.size
+        for index, ch in enumerate(text[:n * n]):
+            board.set_cell(index // n, index % n, 0 if ch == "." else DIGIT_CHARS.index(ch.upper()))
+        if solution:
+            board.solution = [[DIGIT_CHARS.index(ch) for ch in solution[r * n:r * n + n]] for r in range(n)]
+        return board
+
+    def solution_string(self):
+        if self.solution is None:
+            return None
+        return "".join(DIGIT_CHARS[cell] for row in self.solution for cell in row)
+
+    def wrong_cells(self):
+        # Filled cells that disagree with the cached solution
+        if self.solution is None:
+            return []
+        n = self.size
+        return [(i, j) for i in range(n) for j in range(n)
+                if self.board[i][j] and self.board[i][j] != self.solution[i][j]]
+
     def copy(self):
-        new_board = SudokuBoard()
-        for i in range(9):
-            for j in range(9):
-                new_board.set_cell(i, j, self.get_cell(i, j))
-        return new_board
\ No newline at end of file
+        new_board = SudokuBoard(self.box_size)
+        new_board.board = [row[:] for row in self.board]
+        new_board.row_mask = self.row_mask[:]
+        new_board.col_mask = self.col_mask[:]
+        new_board.box_mask = self.box_mask[:]
+        new_board.row_count = [counts[:] for counts in self.row_count]
+        new_board.col_count = [counts[:] for counts in self.col_count]
+        new_board.box_count = [counts[:] for counts in self.box_count]
+        new_board.conflicts = dict(self.conflicts)
+        new_board.solution = self.solution  # never mutated in place, safe to share
+        new_board.rating = self.rating
+        new_board._variant = self._variant
+        if self.unit_count is not None:
+            new_board.unit_count = [counts[:] for counts in self.unit_count]
+        return new_board
@@ -1,71 +1,627 @@
+import multiprocessing
+import queue
 import random
-from sudoku_board import SudokuBoard
+import time
+from csp import ConstraintSearch, SteppedSearch, SudokuVariant, classic_variant, random_cages, random_regions
+from sudoku_board import DIGIT_CHARS, SudokuBoard
 from game_manager import Difficulty
+from grader import PuzzleGrader
+
+# Digits contained in each 9x9 candidate bitmask, e.g. 0b110 -> [1, 2]
+MASK_DIGITS = [[d for d in range(1, 10) if mask & (1 << d)] for mask in range(1 << 10)]
+
+def mask_digits(mask):
+    if mask < len(MASK_DIGITS):
+        return MASK_DIGITS[mask]
+    digits = []
+    while mask:
+        low = mask & -mask
+        digits.append(low.bit_length() - 1)
+        mask ^= low
+    return digits
+
+class DancingLinks:
+    # Exact-cover matrix stored as parallel index arrays (Knuth's Algorithm X).
+    # Node 0 is the root, nodes 1..n_columns are the column headers.
+    def __init__(self, n_columns, rows):
+        n = n_columns + 1
+        self.L = [i - 1 for i in range(n)]
+        self.R = [i + 1 for i in range(n)]
+        self.L[0] = n_columns
+        self.R[n_columns] = 0
+        self.U = list(range(n))
+        self.D = list(range(n))
+        self.C = list(range(n))
+        self.row_of = [-1] * n
+        self.size = [0] * n
+        for row_id, columns in rows:
+            first = None
+            for column in columns:
+                c = column + 1
+                node = len(self.C)
+                self.C.append(c)
+                self.row_of.append(row_id)
+                # Append at the bottom of the column
+                self.U.append(self.U[c])
+                self.D.append(c)
+                self.D[self.U[c]] = node
+                self.U[c] = node
+                self.size[c] += 1
+                if first is None:
+                    first = node
+                    self.L.append(node)
+                    self.R.append(node)
+                else:
+                    self.L.append(self.L[first])
+                    self.R.append(first)
+                    self.R[self.L[first]] = node
+                    self.L[first] = node
+        self.nodes = 0
+        self.max_nodes = None  # node budget for one search; None is unlimited
+        self.aborted = False
+
+    def cover(self, c):
+        L, R, U, D, C, size = self.L, self.R, self.U, self.D, self.C, self.size
+        R[L[c]] = R[c]
+        L[R[c]] = L[c]
+        i = D[c]
+        while i != c:
+            j = R[i]
+            while j != i:
+                D[U[j]] = D[j]
+                U[D[j]] = U[j]
+                size[C[j]] -= 1
+                j = R[j]
+            i = D[i]
+
+    def uncover(self, c):
+        L, R, U, D, C, size = self.L, self.R, self.U, self.D, self.C, self.size
+        i = U[c]
+        while i != c:
+            j = L[i]
+            while j != i:
+                size[C[j]] += 1
+                D[U[j]] = j
+                U[D[j]] = j
+                j = L[j]
+            i = U[i]
+        R[L[c]] = c
+        L[R[c]] = c
+
+    def search(self, solution, randomize=False):
+        self.nodes += 1
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            self.aborted = True
+            return False
+        R, D, C, size = self.R, self.D, self.C, self.size
+        if R[0] == 0:
+            return True
+        # Column with the fewest remaining rows
+        c = R[0]
+        best = c
+        best_size = size[c]
+        while c != 0:
+            if size[c] < best_size:
+                best, best_size = c, size[c]
+                if best_size <= 1:
+                    break
+            c = R[c]
+        if best_size == 0:
+            return False
+        c = best
+        self.cover(c)
+        rows = []
+        r = D[c]
+        while r != c:
+            rows.append(r)
+            r = D[r]
+        if randomize:
+            random.shuffle(rows)
+        for r in rows:
+            solution.append(self.row_of[r])
+            j = R[r]
+            while j != r:
+                self.cover(C[j])
+                j = R[j]
+            if self.search(solution, randomize):
+                return True
+            j = self.L[r]
+            while j != r:
+                self.uncover(C[j])
+                j = self.L[j]
+            solution.pop()
+            if self.aborted:
+                break
+        self.uncover(c)
+        return False
+
+    def count(self, limit):
+        # Number of exact covers, stopping as soon as `limit` are found
+        self.nodes += 1
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            self.aborted = True
+            return 0
+        R, D, L, C, size = self.R, self.D, self.L, self.C, self.size
+        if R[0] == 0:
+            return 1
+        c = R[0]
+        best = c
+        best_size = size[c]
+        while c != 0:
+            if size[c] < best_size:
+                best, best_size = c, size[c]
+                if best_size <= 1:
+                    break
+            c = R[c]
+        if best_size == 0:
+            return 0
+        c = best
+        self.cover(c)
+        found = 0
+        r = D[c]
+        while r != c and found < limit and not self.aborted:
+            j = R[r]
+            while j != r:
+                self.cover(C[j])
+                j = R[j]
+            found += self.count(limit - found)
+            j = L[r]
+            while j != r:
+                self.uncover(C[j])
+                j = L[j]
+            r = D[r]
+        self.uncover(c)
+        return found
+
+def sudoku_exact_cover(board, exclude=None):
+    # Exact-cover matrix for the board: one column per constraint (cell
+    # filled, digit once per row, per column, per box; 4 x 81 = 324 for an
+    # empty classic board) and one row per (cell, digit). Constraints the
+    # givens already satisfy and digits they rule out are left out, so the
+    # matrix only holds the part of the search that is still open.
+    # Returns None if the givens clash. `exclude` is an optional (row, col,
+    # digit) left out of the matrix, to look for solutions without it.
+    if not board.is_valid():
+        return None
+    n, b = board.size, board.box_size
+    cells = n * n
+    columns = {}
+    for i in range(n):
+        for j in range(n):
+            if not board.board[i][j]:
+                columns[i * n + j] = len(columns)
+    for k in range(n):
+        for d in range(n):
+            bit = 1 << (d + 1)
+            if not board.row_mask[k] & bit:
+                columns[cells + k * n + d] = len(columns)
+            if not board.col_mask[k] & bit:
+                columns[2 * cells + k * n + d] = len(columns)
+            if not board.box_mask[k] & bit:
+                columns[3 * cells + k * n + d] = len(columns)
+    rows = []
+    for i in range(n):
+        for j in range(n):
+            if board.board[i][j]:
+                continue
+            box = (i // b) * b + j // b
+            for d in mask_digits(board.candidates(i, j)):
+                if (i, j, d) == exclude:
+                    continue
+                d -= 1
+                rows.append(((i * n + j) * n + d, (
+                    columns[i * n + j],
+                    columns[cells + i * n + d],
+                    columns[2 * cells + j * n + d],
+                    columns[3 * cells + box * n + d],
+                )))
+    return DancingLinks(len(columns), rows)
+
+# Strategies raced by a portfolio solve: (backend, random seed)
+PORTFOLIO = (("backtracking", 1), ("backtracking", 2), ("csp", 3), ("dlx", 4))
+
+def portfolio_worker(backend, seed, text, variant, results):
+    # Runs in a child process; reports the solved grid as text (None if the
+    # puzzle has no solution)
+    random.seed(seed)
+    board = SudokuBoard.from_string(text)
+    board.variant = variant
+    solved = SudokuSolver(backend).solve_puzzle(board)
+    results.put((backend, seed, board.to_string() if solved else None))
 
 class SudokuSolver:
-    def generate_puzzle(self, difficulty):
-        board = SudokuBoard()
-        self.fill_board(board)
-        self.remove_numbers(board, difficulty)
-        return board
-    
+    # Boards with a variant always go through the csp engine
+    BACKENDS = ("backtracking", "dlx", "csp")
+
+    def __init__(self, backend="dlx", portfolio=False, timeout=5.0):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown solver backend: {backend}")
+        self.backend = backend
+        # With portfolio on, solves that don't finish quickly in-process race
+        # every PORTFOLIO strategy in its own process and take the first
+        # answer, giving up after `timeout` seconds
+        self.portfolio = portfolio
+        self.timeout = timeout
+        self.winner = None  # strategy that answered the last portfolio race
+        self.nodes = 0  # search nodes visited by the last solve
+        self.grader = PuzzleGrader()
+
+    def generate_puzzle(self, difficulty, attempts=10, box_size=3):
+        # Retry with a fresh grid until the grader rates the puzzle at the
+        # requested difficulty; some grids can't produce the harder buckets.
+        # If no attempt gets there, the one rated closest to it is returned.
+        # Either way board.rating says what the puzzle was actually rated.
+        best = None
+        for _ in range(attempts):
+            board = SudokuBoard(box_size)
+            self.fill_board(board)
+            board.solution = [row[:] for row in board.board]
+            board.rating = self.remove_numbers(board, difficulty)
+            if best is None or board.rating.value > best.rating.value:
+                best = board
+            if board.rating == difficulty:
+                break
+        return best
+
+    def generate_variant(self, difficulty, diagonals=False, jigsaw=False, killer=False,
+                         attempts=10, box_size=3):
+        # A puzzle with extra rules. Jigsaw regions are drawn first; killer
+        # cages are cut from the filled grid, so they always add up.
+        for _ in range(attempts):
+            regions = random_regions(box_size) if jigsaw else None
+            board = SudokuBoard(box_size)
+            board.variant = SudokuVariant(box_size, regions, diagonals)
+            # Some jigsaw layouts have no solution at all; don't hunt for long
+            search = ConstraintSearch(board.variant, max_nodes=100 * board.size * board.size)
+            grid = search.solve(board.board, randomize=True)
+            if grid is None:
+                continue
+            if killer:
+                board.variant = board.variant.with_cages(random_cages(grid))
+            for i in range(board.size):
+                for j in range(board.size):
+                    board.set_cell(i, j, grid[i][j])
+            board.solution = grid
+            board.rating = self.remove_numbers(board, difficulty)
+            return board
+        return None
+
     def fill_board(self, board):
-        self.solve_puzzle(board)
-    
+        if board.box_size <= 3 or board.variant is not None:
+            self.solve_puzzle(board)
+            return
+        # Searching an empty 16x16 or 25x25 grid can stall, so start from a
+        # patterned solution and shuffle it with validity-preserving moves:
+        # relabel digits, swap rows within bands and bands, same for columns
+        b, n = board.box_size, board.size
+        digits = list(range(1, n + 1))
+        random.shuffle(digits)
+        def shuffled_lines():
+            bands = random.sample(range(b), b)
+            return [band * b + line for band in bands for line in random.sample(range(b), b)]
+        rows, cols = shuffled_lines(), shuffled_lines()
+        for i, r in enumerate(rows):
+            for j, c in enumerate(cols):
+                board.set_cell(i, j, digits[(b * (r % b) + r // b + c) % n])
+
     def remove_numbers(self, board, difficulty):
-        cells_to_remove = {
-            Difficulty.EASY: 40,
-            Difficulty.MEDIUM: 50,
-            Difficulty.HARD: 60,
-            Difficulty.EXPERT: 70
-        }[difficulty]
-        
-        cells = [(i, j) for i in range(9) for j in range(9)]
+        # Blank cells in random order, keeping a removal only while the puzzle
+        # still has exactly one solution, until enough cells are blank; then
+        # bring the grader's rating to the requested difficulty. Returns the
+        # final rating. EXPERT asks for more blanks than a unique puzzle can
+        # have, so it ends at a minimal puzzle.
+        n = board.size
+        cells = [(i, j) for i in range(n) for j in range(n)]
         random.shuffle(cells)
-        
-        for i, j in cells[:cells_to_remove]:
-            board.set_cell(i, j, 0)
-    
+        # The grader only knows the classic techniques on 9x9; larger boards
+        # and variants are bucketed by the number of blanks alone, and their
+        # uniqueness checks get a node budget: a clue whose removal can't be
+        # proven safe within it stays on the board
+        classic = board.variant is None
+        graded = classic and board.box_size == 3
+        max_nodes = None if graded else n * n
+        # Blanks per 81 cells, the same share on other sizes. A minimal
+        # 16x16 or 25x25 puzzle still has about 40% of its cells given, so
+        # the targets of classic boards the grader can't rate stay below
+        # that and only EXPERT goes on to a minimal puzzle
+        if classic and not graded:
+            blanks = {Difficulty.EASY: 40, Difficulty.MEDIUM: 42, Difficulty.HARD: 44, Difficulty.EXPERT: 81}
+        else:
+            blanks = {Difficulty.EASY: 40, Difficulty.MEDIUM: 50, Difficulty.HARD: 60, Difficulty.EXPERT: 70}
+        cells_to_remove = blanks[difficulty] * n * n // 81
+
+        removed = []  # (row, col, value) of each blanked cell, in order
+        tried = 0
+        for i, j in cells:
+            if len(removed) >= cells_to_remove:
+                break
+            tried += 1
+            value = self.try_remove(board, i, j, classic, max_nodes)
+            if value:
+                removed.append((i, j, value))
+        if not graded:
+            # The blanks are the rating: a pass that ran out of removable
+            # clues short of the target gets the bucket it did reach
+            if len(removed) >= cells_to_remove or difficulty == list(Difficulty)[-1]:
+                return difficulty
+            return max((level for level in Difficulty if len(removed) >= blanks[level] * n * n // 81),
+                       key=lambda level: level.value, default=Difficulty.EASY)
+
+        # Grading is a full human-style solve, so it runs once here rather
+        # than after every removal. Too hard: put the latest removals back,
+        # bisecting on how many, since more clues never make it harder. Too
+        # easy: carry on through the cells put back after the one that made
+        # it too hard, then the untried ones, grading each removal.
+        rating = self.grader.rate(board)
+        retry = cells[tried:]
+        if rating.value > difficulty.value:
+            low, high = 0, len(removed)  # putting back `high` removals is easy enough
+            high_rating = Difficulty.EASY
+            while high - low > 1:
+                middle = (low + high) // 2
+                self.put_back(board, removed, middle)
+                middle_rating = self.grader.rate(board)
+                if middle_rating.value > difficulty.value:
+                    low = middle
+                else:
+                    high, high_rating = middle, middle_rating
+            self.put_back(board, removed, high)
+            rating = high_rating
+            retry = [(i, j) for i, j, _ in removed[len(removed) - high + 1:]] + retry
+        for i, j in retry:
+            if rating == difficulty:
+                break
+            value = self.try_remove(board, i, j, classic, max_nodes)
+            if not value:
+                continue
+            new_rating = self.grader.rate(board)
+            if new_rating.value > difficulty.value:
+                board.set_cell(i, j, value)
+                continue
+            rating = new_rating
+        return rating
+
+    def try_remove(self, board, row, col, classic, max_nodes):
+        # Blanks (row, col) if the puzzle keeps exactly one solution and
+        # returns the value it held, or 0 if the clue has to stay. A blank
+        # the remaining clues force straight away needs no search.
+        value = board.get_cell(row, col)
+        board.set_cell(row, col, 0)
+        if not (classic and board.is_forced(row, col, value)) and not self.unique_without(board, row, col, value,
+                                                                                          max_nodes):
+            board.set_cell(row, col, value)
+            return 0
+        return value
+
+    def unique_without(self, board, row, col, value, max_nodes=None):
+        # Whether a puzzle with one solution still has only that one after
+        # (row, col), which held `value` in it, was blanked: it does if no
+        # other digit fits there. dlx checks that directly, which is cheaper
+        # than counting to two. None if the search runs out of max_nodes.
+        if self.backend == "dlx" and board.variant is None:
+            dlx = sudoku_exact_cover(board, (row, col, value))
+            dlx.max_nodes = max_nodes
+            found = dlx.count(1)
+            self.nodes = dlx.nodes
+            return None if dlx.aborted else not found
+        count = self.count_solutions(board, 2, max_nodes)
+        return None if count is None else count == 1
+
+    def put_back(self, board, removed, count):
+        # Refills the last `count` cells of `removed` and blanks the rest
+        first = len(removed) - count
+        for index, (i, j, value) in enumerate(removed):
+            board.set_cell(i, j, value if index >= first else 0)
+
     def solve_puzzle(self, board):
-        empty = board.get_empty_cell()
-        if not empty:
+        self.nodes = 0
+        if self.portfolio:
+            return self.solve_portfolio(board)
+        if self.backend == "csp" or board.variant is not None:
+            return self.solve_csp(board)
+        if self.backend == "dlx":
+            return self.solve_dlx(board)
+        return self.solve_backtracking(board)
+
+    def solve_backtracking(self, board):
+        # Branch on the empty cell with the fewest candidates (MRV)
+        self.nodes += 1
+        cell = board.get_most_constrained_cell()
+        if not cell:
             return True
-        row, col = empty
-        
-        nums = list(range(1, 10))
+        row, col, mask = cell
+
+        nums = mask_digits(mask)[:]
         random.shuffle(nums)
         for num in nums:
-            if self.is_safe(board, row, col, num):
-                board.set_cell(row, col, num)
-                if self.solve_puzzle(board):
-                    return True
-                board.set_cell(row, col, 0)
-        
+            board.set_cell(row, col, num)
+            if self.solve_backtracking(board):
+                return True
+        board.set_cell(row, col, 0)
+
         return False
-    
-    def is_safe(self, board, row, col, num):
-        # Check row
-        if num in [board.get_cell(row, i) for i in range(9) if board.get_cell(row, i) != 0]:
+
+    def count_solutions(self, board, limit=2, max_nodes=None):
+        # Counts solutions of the board without modifying it, stopping at
+        # `limit`. Returns None if the dlx or csp search runs out of max_nodes.
+        self.nodes = 0
+        if self.backend == "csp" or board.variant is not None:
+            search = ConstraintSearch(board.variant or classic_variant(board.box_size), max_nodes)
+            found = search.count(board.board, limit)
+            self.nodes = search.nodes
+            return None if search.aborted else found
+        if self.backend == "dlx":
+            dlx = sudoku_exact_cover(board)
+            if dlx is None:
+                return 0
+            dlx.max_nodes = max_nodes
+            found = dlx.count(limit)
+            self.nodes = dlx.nodes
+            return None if dlx.aborted else found
+        return self.count_backtracking(board.copy(), limit)
+
+    def count_backtracking(self, board, limit):
+        self.nodes += 1
+        cell = board.get_most_constrained_cell()
+        if not cell:
+            return 1
+        row, col, mask = cell
+        found = 0
+        for num in mask_digits(mask):
+            board.set_cell(row, col, num)
+            found += self.count_backtracking(board, limit - found)
+            if found >= limit:
+                break
+        board.set_cell(row, col, 0)
+        return found
+
+    def solve_dlx(self, board):
+        # Randomized search restarted with a doubled node budget whenever it
+        # runs over, which cuts off the heavy tail of unlucky branch orders
+        # on large boards
+        max_nodes = 10 * board.size * board.size
+        while True:
+            dlx = sudoku_exact_cover(board)
+            if dlx is None:
+                return False
+            dlx.max_nodes = max_nodes
+            solution = []
+            solved = dlx.search(solution, randomize=True)
+            self.nodes += dlx.nodes
+            if not dlx.aborted:
+                break
+            max_nodes *= 2
+        if solved:
+            n = board.size
+            for row_id in solution:
+                cell, d = divmod(row_id, n)
+                board.set_cell(cell // n, cell % n, d + 1)
+        return solved
+
+    def solve_csp(self, board):
+        # Same restart schedule as solve_dlx
+        variant = board.variant or classic_variant(board.box_size)
+        max_nodes = 10 * board.size * board.size
+        while True:
+            search = ConstraintSearch(variant, max_nodes)
+            grid = search.solve(board.board, randomize=True)
+            self.nodes += search.nodes
+            if not search.aborted:
+                break
+            max_nodes *= 2
+        if grid is None:
             return False
-        
-        # Check column
-        if num in [board.get_cell(i, col) for i in range(9) if board.get_cell(i, col) != 0]:
+        for i in range(board.size):
+            for j in range(board.size):
+                board.set_cell(i, j, grid[i][j])
+        return True
+
+    def solve_steps(self, board):
+        # A search for the board's solution that the caller advances a bounded
+        # number of nodes at a time, for the UI loop; the board isn't touched
+        return SteppedSearch(board.variant or classic_variant(board.box_size), board.board)
+
+    def solve_portfolio(self, board):
+        # Most boards fall to one short propagating search, so try that in
+        # process first; only the pathological ones pay for starting the race
+        variant = board.variant or classic_variant(board.box_size)
+        search = ConstraintSearch(variant, max_nodes=board.size * board.size)
+        grid = search.solve(board.board, randomize=True)
+        self.nodes = search.nodes
+        self.winner = None
+        if not search.aborted:
+            text = None if grid is None else "".join(DIGIT_CHARS[value] for row in grid for value in row)
+        else:
+            text = self.race(board)
+            if text is False:
+                return False  # timed out
+        if text is None:
             return False
-        
-        # Check 3x3 box
-        box_row, box_col = 3 * (row // 3), 3 * (col // 3)
-        for i in range(box_row, box_row + 3):
-            for j in range(box_col, box_col + 3):
-                if board.get_cell(i, j) == num:
-                    return False
-        
+        solved = SudokuBoard.from_string(text)
+        for i in range(board.size):
+            for j in range(board.size):
+                board.set_cell(i, j, solved.board[i][j])
         return True
-    
-    def get_hint(self, board):
+
+    def race(self, board):
+        # First answer from the PORTFOLIO processes: the solution text, None
+        # if a strategy proved there is none, or False after self.timeout.
+        # The losers are terminated either way.
+        results = multiprocessing.Queue()
+        workers = [
+            multiprocessing.Process(target=portfolio_worker, daemon=True,
+                                    args=(backend, seed, board.to_string(), board.variant, results))
+            for backend, seed in PORTFOLIO
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            backend, seed, text = results.get(timeout=self.timeout)
+            self.winner = (backend, seed)
+            return text
+        except queue.Empty:
+            return False
+        finally:
+            for worker in workers:
+                worker.terminate()
+            for worker in workers:
+                worker.join()
+            results.close()
+
+    def is_safe(self, board, row, col, num):
+        if board.variant is not None:
+            return bool(board.variant.candidates(board.board, row, col) & (1 << num))
+        return bool(board.candidates(row, col) & (1 << num))
+
+    def ensure_solution(self, board):
+        # The board's cached solution. Puzzles have exactly one solution, so
+        # it stays right whatever the player enters; wrong entries are just
+        # compared against it. Only a board without one gets solved.
+        if board.solution is not None:
+            return board.solution
         solved_board = board.copy()
         if self.solve_puzzle(solved_board):
-            for i in range(9):
-                for j in range(9):
-                    if board.get_cell(i, j) == 0:
-                        return i, j, solved_board.get_cell(i, j)
-        return None
\ No newline at end of file
+            board.solution = solved_board.board
+        return board.solution
+
+    def get_hint(self, board):
+        return self.hint_from(board, self.ensure_solution(board))
+
+    def hint_from(self, board, solution):
+        if solution is None:
+            return None
+        # Entries that can't be completed get corrected before anything else
+        for i, j in board.wrong_cells():
+            return i, j, solution[i][j]
+        for i in range(board.size):
+            for j in range(board.size):
+                if board.get_cell(i, j) == 0:
+                    return i, j, solution[i][j]
+        return None
+
+    def check(self, board):
+        if self.ensure_solution(board) is None:
+            return False
+        return not board.wrong_cells()
+
+    def reveal_solution(self, board):
+        return self.fill_from(board, self.ensure_solution(board))
+
+    def fill_from(self, board, solution):
+        if solution is None:
+            return False
+        for i in range(board.size):
+            for j in range(board.size):
+                board.set_cell(i, j, solution[i][j])
+        return True
+
+def compare_backends(board, backends=SudokuSolver.BACKENDS):
+    # Solve copies of the same board with each backend: {backend: (solved, nodes, seconds)}
+    results = {}
+    for backend in backends:
+        solver = SudokuSolver(backend)
+        work = board.copy()
+        start = time.perf_counter()
+        solved = solver.solve_puzzle(work)
+        results[backend] = (solved, solver.nodes, time.perf_counter() - start)
+    return results
@@ -1,11 +1,19 @@
 import pygame
+from sudoku_board import DIGIT_CHARS
 
 class UIManager:
+    @staticmethod
+    def cell_size_for(size):
+        # 50px cells on the classic board, shrinking (but staying readable) on 16x16 and 25x25
+        return max(24, 450 // size)
+
     def __init__(self, screen, game_manager):
         self.screen = screen
         self.game_manager = game_manager
-        self.cell_size = 50
-        self.board_size = 9 * self.cell_size
+        self.size = game_manager.box_size ** 2
+        self.cell_size = self.cell_size_for(self.size)
+        self.board_size = self.size * self.cell_size
+        self.cell_font = pygame.font.Font(None, self.cell_size * 36 // 50)
         self.margin = 20
         self.button_width = 100
         self.button_height = 40
@@ -25,15 +33,18 @@ class UIManager:
         if event.type == pygame.MOUSEBUTTONDOWN:
             x, y = event.pos
             if y < self.board_size:
-                self.selected_cell = (y // self.cell_size, x // self.cell_size)
+                if x < self.board_size:
+                    self.selected_cell = (y // self.cell_size, x // self.cell_size)
             else:
                 for button, rect in self.buttons.items():
                     if rect.collidepoint(x, y):
                         self.handle_button_click(button)
         elif event.type == pygame.KEYDOWN and self.selected_cell:
-            if event.unicode.isdigit() and event.unicode != '0':
+            # 1-9, then letters for the values above 9 on larger boards
+            key = event.unicode.upper()
+            if key and key in DIGIT_CHARS[1:self.size + 1]:
                 row, col = self.selected_cell
-                self.game_manager.make_move(row, col, int(event.unicode))
+                self.game_manager.make_move(row, col, DIGIT_CHARS.index(key))
     
     def handle_button_click(self, button):
         if button == 'New Game':
@@ -58,8 +69,9 @@ class UIManager:
         self.draw_score()
     
     def draw_board(self):
-        for i in range(9):
-            for j in range(9):
+        progress = self.game_manager.progress()
+        for i in range(self.size):
+            for j in range(self.size):
                 x = j * self.cell_size
                 y = i * self.cell_size
                 cell_rect = pygame.Rect(x, y, self.cell_size, self.cell_size)
@@ -70,13 +82,19 @@ class UIManager:
                 
                 value = self.game_manager.board.get_cell(i, j)
                 if value != 0:
-                    font = pygame.font.Font(None, 36)
-                    text = font.render(str(value), True, (0, 0, 0))
+                    # Repeated digits in a row, column or box are shown in red
+                    color = (200, 0, 0) if (i, j) in self.game_manager.board.conflicts else (0, 0, 0)
+                    text = self.cell_font.render(DIGIT_CHARS[value], True, color)
+                    text_rect = text.get_rect(center=(x + self.cell_size // 2, y + self.cell_size // 2))
+                    self.screen.blit(text, text_rect)
+                elif progress and progress[i][j]:
+                    # A running Hint/Solve search shows its guesses in grey
+                    text = self.cell_font.render(DIGIT_CHARS[progress[i][j]], True, (160, 160, 160))
                     text_rect = text.get_rect(center=(x + self.cell_size // 2, y + self.cell_size // 2))
                     self.screen.blit(text, text_rect)
         
-        # Draw thicker lines for 3x3 boxes
-        for i in range(0, 10, 3):
+        # Draw thicker lines around the boxes
+        for i in range(0, self.size + 1, self.game_manager.box_size):
             pygame.draw.line(self.screen, (0, 0, 0), (0, i * self.cell_size), (self.board_size, i * self.cell_size), 3)
             pygame.draw.line(self.screen, (0, 0, 0), (i * self.cell_size, 0), (i * self.cell_size, self.board_size), 3)
     
@@ -1,7 +1,7 @@
 import tkinter as tk
 from tkinter import messagebox
 import random
-from ai import get_best_move
+from ai import get_best_move, check_winner
 
 class TicTacToe:
     def __init__(self, master):
@@ -108,20 +108,8 @@ class TicTacToe:
         self.make_move(row, col)
 
     def check_winner(self):
-        # Check rows and columns
-        for i in range(4):
-            if self.board[i][0] == self.board[i][1] == self.board[i][2] == self.board[i][3] != ' ':
-                return self.board[i][0]
-            if self.board[0][i] == self.board[1][i] == self.board[2][i] == self.board[3][i] != ' ':
-                return self.board[0][i]
-        
-        # Check diagonals
-        if self.board[0][0] == self.board[1][1] == self.board[2][2] == self.board[3][3] != ' ':
-            return self.board[0][0]
-        if self.board[0][3] == self.board[1][2] == self.board[2][1] == self.board[3][0] != ' ':
-            return self.board[0][3]
-        
-        return None
+        # Use the check_winner function from ai.py
+        return check_winner(self.board)
 
     def is_full(self):
         return all(cell != ' ' for row in self.board for cell in row)
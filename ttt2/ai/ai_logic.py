@@ -1,78 +1,56 @@
-import random
+import os
+import sys
+
+# The shared k-in-a-row engine lives in the top-level ai folder
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, 'ai'))
+from kinarow import engine_for, check_winner, is_board_full
 
 def get_best_move(board):
     print("get_best_move called")
+    engine = engine_for(len(board))
+    marks = engine.encode(board)
+    green = marks.get('Green', 0)
+    red = marks.get('Red', 0)
     best_score = float('-inf')
     best_move = None
     alpha = float('-inf')
     beta = float('inf')
-    for i in range(5):
-        for j in range(5):
-            if board[i][j] == ' ':
-                board[i][j] = 'Green'
-                score = minimax(board, 0, False, 3, alpha, beta)
-                board[i][j] = ' '
-                if score > best_score:
-                    best_score = score
-                    best_move = (i, j)
-                alpha = max(alpha, best_score)
-                if beta <= alpha:
-                    break
+    for cell in engine.empty_cells(green | red):
+        score = minimax(engine, green | 1 << cell, red, cell, 0, False, 3, alpha, beta)
+        if score > best_score:
+            best_score = score
+            best_move = divmod(cell, engine.size)
+        alpha = max(alpha, best_score)
     print(f"Best move found: {best_move}")
     return best_move
 
-def minimax(board, depth, is_maximizing, max_depth, alpha, beta):
-    print(f"Minimax called with depth {depth}, is_maximizing {is_maximizing}")
-    winner = check_winner(board)
-    if winner == 'Green':
+def minimax(engine, green, red, last, depth, is_maximizing, max_depth, alpha, beta):
+    # green and red are bitboards (see kinarow.py) and `last` is the cell
+    # just taken, the only mark that can have made a new line
+    if is_maximizing:
+        if engine.wins_at(red, last):
+            return -1
+    elif engine.wins_at(green, last):
         return 1
-    elif winner == 'Red':
-        return -1
-    elif is_board_full(board) or depth == max_depth:
+    taken = green | red
+    if taken == engine.full or depth == max_depth:
         return 0
 
     if is_maximizing:
         best_score = float('-inf')
-        for i in range(5):
-            for j in range(5):
-                if board[i][j] == ' ':
-                    board[i][j] = 'Green'
-                    score = minimax(board, depth + 1, False, max_depth, alpha, beta)
-                    board[i][j] = ' '
-                    best_score = max(score, best_score)
-                    alpha = max(alpha, best_score)
-                    if beta <= alpha:
-                        break
+        for cell in engine.empty_cells(taken):
+            score = minimax(engine, green | 1 << cell, red, cell, depth + 1, False, max_depth, alpha, beta)
+            best_score = max(score, best_score)
+            alpha = max(alpha, best_score)
+            if beta <= alpha:
+                break
         return best_score
     else:
         best_score = float('inf')
-        for i in range(5):
-            for j in range(5):
-                if board[i][j] == ' ':
-                    board[i][j] = 'Red'
-                    score = minimax(board, depth + 1, True, max_depth, alpha, beta)
-                    board[i][j] = ' '
-                    best_score = min(score, best_score)
-                    beta = min(beta, best_score)
-                    if beta <= alpha:
-                        break
+        for cell in engine.empty_cells(taken):
+            score = minimax(engine, green, red | 1 << cell, cell, depth + 1, True, max_depth, alpha, beta)
+            best_score = min(score, best_score)
+            beta = min(beta, best_score)
+            if beta <= alpha:
+                break
         return best_score
-
-def check_winner(board):
-    # Check rows and columns
-    for i in range(5):
-        if board[i][0] == board[i][1] == board[i][2] == board[i][3] == board[i][4] != ' ':
-            return board[i][0]
-        if board[0][i] == board[1][i] == board[2][i] == board[3][i] == board[4][i] != ' ':
-            return board[0][i]
-    
-    # Check diagonals
-    if board[0][0] == board[1][1] == board[2][2] == board[3][3] == board[4][4] != ' ':
-        return board[0][0]
-    if board[0][4] == board[1][3] == board[2][2] == board[3][1] == board[4][0] != ' ':
-        return board[0][4]
-    
-    return None
-
-def is_board_full(board):
-    return all(cell != ' ' for row in board for cell in row)
\ No newline at end of file
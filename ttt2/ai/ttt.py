@@ -1,4 +1,10 @@
+import os
 import random
+import sys
+
+# The shared k-in-a-row engine lives in the top-level ai folder
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, 'ai'))
+from kinarow import check_winner
 
 def get_best_move(board):
     # Check for winning move
@@ -40,19 +46,3 @@ def get_best_move(board):
             return edge
 
     return None
-
-def check_winner(board):
-    # Check rows and columns
-    for i in range(5):
-        if board[i][0] == board[i][1] == board[i][2] == board[i][3] == board[i][4] != ' ':
-            return board[i][0]
-        if board[0][i] == board[1][i] == board[2][i] == board[3][i] == board[4][i] != ' ':
-            return board[0][i]
-    
-    # Check diagonals
-    if board[0][0] == board[1][1] == board[2][2] == board[3][3] == board[4][4] != ' ':
-        return board[0][0]
-    if board[0][4] == board[1][3] == board[2][2] == board[3][1] == board[4][0] != ' ':
-        return board[0][4]
-    
-    return None
\ No newline at end of file